@@ -1,29 +1,32 @@
+import array
 import enum
-from typing import List, Optional, Tuple, Union
+from typing import List, Optional, Tuple
 
 import memory
 import value
 
-Byte = Union["OpCode", value.Value]
-Code = Optional[List[Optional[Byte]]]
+Byte = int
+Code = Optional[bytearray]
+Lines = Optional["array.array[int]"]
 
 
-class OpCode(enum.Enum):
+class OpCode(enum.IntEnum):
     """Each instruction has a 1-byte operation code, which controls what kind of
     instruction we're dealing with."""
-    OP_CONSTANT = "OP_CONSTANT"
-    OP_NIL = "OP_NIL"
-    OP_POP = "OP_POP"
-    OP_GET_LOCAL = "OP_GET_LOCAL"
-    OP_SET_LOCAL = "OP_SET_LOCAL"
-    OP_ADD = "OP_ADD"
-    OP_SUBTRACT = "OP_SUBTRACT"
-    OP_MULTIPLY = "OP_MULTIPLY"
-    OP_DIVIDE = "OP_DIVIDE"
-    OP_NEGATE = "OP_NEGATE"
-    OP_PRINT = "OP_PRINT"
-    OP_CALL = "OP_CALL"
-    OP_RETURN = "OP_RETURN"
+    OP_CONSTANT = 0
+    OP_NIL = 1
+    OP_POP = 2
+    OP_POPN = 3
+    OP_GET_LOCAL = 4
+    OP_SET_LOCAL = 5
+    OP_ADD = 6
+    OP_SUBTRACT = 7
+    OP_MULTIPLY = 8
+    OP_DIVIDE = 9
+    OP_NEGATE = 10
+    OP_PRINT = 11
+    OP_CALL = 12
+    OP_RETURN = 13
 
 
 class Chunk():
@@ -33,7 +36,7 @@ class Chunk():
         self.count = 0
         self.capacity = 0
         self.code = None  # type: Code
-        self.lines = None  # type: Optional[List[int]]
+        self.lines = None  # type: Lines
         self.constants = None  # type: Optional[value.ValueArray]
 
 
@@ -62,13 +65,24 @@ def free_chunk(bytecode):
     return init_chunk()
 
 
+def new_code():
+    # type: () -> Tuple[bytearray, array.array[int]]
+    """Creates empty code and line buffers, holding one byte and one line
+    number per instruction byte."""
+    return bytearray(), array.array("i")
+
+
 def write_chunk(bytecode, byte, line):
     # type: (Chunk, Byte, int) -> Chunk
     """Append byte to the end of the chunk."""
     # If current array not have capacity for new byte, grow array.
     if bytecode.capacity < bytecode.count + 1:
+        if bytecode.code is None:
+            bytecode.code, bytecode.lines = new_code()
+
         old_capacity = bytecode.capacity
         bytecode.capacity = memory.grow_capacity(old_capacity)
+        assert bytecode.lines is not None
         bytecode.code = memory.grow_array(bytecode.code, old_capacity, bytecode.capacity)
         bytecode.lines = memory.grow_array(bytecode.lines, old_capacity, bytecode.capacity)
 
@@ -81,8 +95,38 @@ def write_chunk(bytecode, byte, line):
     return bytecode
 
 
+def extend_chunk(bytecode, code, line):
+    # type: (Chunk, List[Byte], int) -> Chunk
+    """Append several bytes from the same line to the end of the chunk, growing
+    the array at most once."""
+    count = bytecode.count + len(code)
+
+    # If current array not have capacity for new bytes, grow array.
+    if bytecode.capacity < count:
+        if bytecode.code is None:
+            bytecode.code, bytecode.lines = new_code()
+
+        old_capacity = bytecode.capacity
+        bytecode.capacity = memory.grow_capacity(old_capacity)
+
+        while bytecode.capacity < count:
+            bytecode.capacity = memory.grow_capacity(bytecode.capacity)
+
+        assert bytecode.lines is not None
+        bytecode.code = memory.grow_array(bytecode.code, old_capacity, bytecode.capacity)
+        bytecode.lines = memory.grow_array(bytecode.lines, old_capacity, bytecode.capacity)
+
+    assert bytecode.code is not None
+    assert bytecode.lines is not None
+    bytecode.code[bytecode.count:count] = code
+    bytecode.lines[bytecode.count:count] = array.array("i", [line]) * len(code)
+    bytecode.count = count
+
+    return bytecode
+
+
 def add_constant(bytecode, val):
-    # type: (Chunk, value.Value) -> Tuple[Chunk, value.Value]
+    # type: (Chunk, value.Value) -> Tuple[Chunk, int]
     """Append value to the end of the chunk's value array."""
     assert bytecode.constants is not None
     bytecode.constants = value.write_value_array(bytecode.constants, val)
@@ -1,6 +1,9 @@
+import collections
+import copy
 import enum
 import functools
-from typing import Callable, Dict, List, Optional, Tuple
+import operator
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import chunk
 import debug
@@ -10,11 +13,54 @@ import value
 
 UINT8_MAX = 8
 UINT8_COUNT = UINT8_MAX + 1
+COMPILE_CACHE_MAX = 128
+UNRESOLVED_SLOT = 0xFF
+
+# Token types used by the statement loops and handler table, bound once at import
+TOKEN_EOF = scanner.TokenType.TOKEN_EOF
+TOKEN_ERROR = scanner.TokenType.TOKEN_ERROR
+TOKEN_FUN = scanner.TokenType.TOKEN_FUN
+TOKEN_VAR = scanner.TokenType.TOKEN_VAR
+TOKEN_PRINT = scanner.TokenType.TOKEN_PRINT
+TOKEN_RETURN = scanner.TokenType.TOKEN_RETURN
+TOKEN_LEFT_BRACE = scanner.TokenType.TOKEN_LEFT_BRACE
+TOKEN_RIGHT_BRACE = scanner.TokenType.TOKEN_RIGHT_BRACE
+
+# Flags for tokens marking a statement boundary when synchronizing after an
+# error, indexed by TokenType
+SYNC_STOP_PREVIOUS = bytearray(len(scanner.TokenType))
+SYNC_STOP_PREVIOUS[scanner.TokenType.TOKEN_SEMICOLON] = 1
+
+SYNC_STOP_CURRENT = bytearray(len(scanner.TokenType))
+SYNC_STOP_CURRENT[scanner.TokenType.TOKEN_FUN] = 1
+SYNC_STOP_CURRENT[scanner.TokenType.TOKEN_VAR] = 1
+SYNC_STOP_CURRENT[scanner.TokenType.TOKEN_PRINT] = 1
+SYNC_STOP_CURRENT[scanner.TokenType.TOKEN_RETURN] = 1
+
+# Opcodes emitted for operator tokens, indexed by TokenType
+BINARY_OPCODES = [None] * len(scanner.TokenType)  # type: List[Optional[chunk.OpCode]]
+BINARY_OPCODES[scanner.TokenType.TOKEN_PLUS] = chunk.OpCode.OP_ADD
+BINARY_OPCODES[scanner.TokenType.TOKEN_MINUS] = chunk.OpCode.OP_SUBTRACT
+BINARY_OPCODES[scanner.TokenType.TOKEN_STAR] = chunk.OpCode.OP_MULTIPLY
+BINARY_OPCODES[scanner.TokenType.TOKEN_SLASH] = chunk.OpCode.OP_DIVIDE
+
+UNARY_OPCODES = [None] * len(scanner.TokenType)  # type: List[Optional[chunk.OpCode]]
+UNARY_OPCODES[scanner.TokenType.TOKEN_MINUS] = chunk.OpCode.OP_NEGATE
+
+# Operations applied when folding binary opcodes over number literals, indexed by OpCode
+FOLD_OPERATIONS = [None] * len(chunk.OpCode)  # type: List[Optional[Callable[[float, float], float]]]
+FOLD_OPERATIONS[chunk.OpCode.OP_ADD] = operator.add
+FOLD_OPERATIONS[chunk.OpCode.OP_SUBTRACT] = operator.sub
+FOLD_OPERATIONS[chunk.OpCode.OP_MULTIPLY] = operator.mul
+FOLD_OPERATIONS[chunk.OpCode.OP_DIVIDE] = operator.truediv
 
 
 def expose(f):
-    """Print the function signature and return value, implemented where function
-    returns processor state."""
+    """Print the function name when tracing parser calls. Running with python -O
+    skips the wrapper, so parser tracing is unavailable there."""
+    if not __debug__:
+        return f
+
     @functools.wraps(f)
     def wrapper(*args, **kwargs):
         if args[0].debug_level >= 3:
@@ -27,29 +73,7 @@ def expose(f):
 
 
 # yapf: disable
-rule_map = {
-    "TOKEN_LEFT_PAREN":    ["grouping", "call",   "PREC_CALL"],
-    "TOKEN_RIGHT_PAREN":   [None,       None,     "PREC_NONE"],
-    "TOKEN_LEFT_BRACE":    [None,       None,     "PREC_NONE"],
-    "TOKEN_RIGHT_BRACE":   [None,       None,     "PREC_NONE"],
-    "TOKEN_MINUS":         ["unary",    "binary", "PREC_TERM"],
-    "TOKEN_PLUS":          [None,       "binary", "PREC_TERM"],
-    "TOKEN_SEMICOLON":     [None,       None,     "PREC_NONE"],
-    "TOKEN_SLASH":         [None,       "binary", "PREC_FACTOR"],
-    "TOKEN_STAR":          [None,       "binary", "PREC_FACTOR"],
-    "TOKEN_EQUAL":         [None,       None,     "PREC_NONE"],
-    "TOKEN_IDENTIFIER":    ["variable", None,     "PREC_NONE"],
-    "TOKEN_NUMBER":        ["number",   None,     "PREC_NONE"],
-    "TOKEN_FUN":           [None,       None,     "PREC_NONE"],
-    "TOKEN_PRINT":         [None,       None,     "PREC_NONE"],
-    "TOKEN_RETURN":        [None,       None,     "PREC_NONE"],
-    "TOKEN_VAR":           [None,       None,     "PREC_NONE"],
-    "TOKEN_ERROR":         [None,       None,     "PREC_NONE"],
-    "TOKEN_EOF":           [None,       None,     "PREC_NONE"],
-}  # type: Dict[str, List[Optional[str]]]
-
-
-class Precedence(enum.Enum):
+class Precedence(enum.IntEnum):
     PREC_NONE = 1
     PREC_ASSIGNMENT = 2  # =
     PREC_EQUALITY = 3    # == !=
@@ -62,32 +86,82 @@ class Precedence(enum.Enum):
 # yapf: enable
 
 
+class RuleKind(enum.IntEnum):
+    """How parse_precedence handles a rule. Rules compiled directly on the
+    parse_precedence stack have no rule function."""
+    RULE_NONE = 0
+    RULE_FUNCTION = 1
+    PREFIX_UNARY = 2
+    PREFIX_GROUPING = 3
+    PREFIX_NUMBER = 4
+    INFIX_BINARY = 5
+
+
+# Rule kinds compared in the parse_precedence loop, bound once at import
+RULE_NONE = RuleKind.RULE_NONE
+PREFIX_UNARY = RuleKind.PREFIX_UNARY
+PREFIX_GROUPING = RuleKind.PREFIX_GROUPING
+PREFIX_NUMBER = RuleKind.PREFIX_NUMBER
+INFIX_BINARY = RuleKind.INFIX_BINARY
+
+RuleFunction = Callable[["Parser", "Compiler"], None]
+Rule = Union[RuleFunction, RuleKind, None]
+
+
+def rule_kind(rule):
+    # type: (Rule) -> RuleKind
+    """Kind of rule given in rule_map."""
+    if rule is None:
+        return RuleKind.RULE_NONE
+
+    if isinstance(rule, RuleKind):
+        return rule
+
+    return RuleKind.RULE_FUNCTION
+
+
 class ParseRule():
+    __slots__ = ("prefix", "infix", "precedence", "prefix_kind", "infix_kind", "precedence_value")
+
     def __init__(self, prefix, infix, precedence):
-        # type: (Optional[Callable], Optional[Callable], Precedence) -> None
+        # type: (Rule, Rule, Precedence) -> None
         """Wrapper for precedence rule."""
-        self.prefix = prefix
-        self.infix = infix
+        self.prefix_kind = rule_kind(prefix)
+        self.prefix = None if isinstance(prefix, RuleKind) else prefix  # type: Optional[RuleFunction]
+        self.infix_kind = rule_kind(infix)
+        self.infix = None if isinstance(infix, RuleKind) else infix  # type: Optional[RuleFunction]
         self.precedence = precedence
-
-
-class Local():
-    def __init__(self, token, depth):
-        # type: (Optional[scanner.Token], int) -> None
-        """Stores token and state of lexical scope."""
-        self.token = token
-        self.depth = depth
+        self.precedence_value = int(precedence)
 
 
 class Compiler():
+    __slots__ = (
+        "enclosing",
+        "fun",
+        "bytecode",
+        "local_names",
+        "local_depths",
+        "local_slots",
+        "local_count",
+        "scope_depth",
+        "number_constants",
+    )
+
     def __init__(self, composer):
         # type: (Optional[Compiler]) -> None
-        """Stores local variables, count and scope depth."""
+        """Stores function being compiled with its bytecode, local variables, count
+        and scope depth. Local variable names and scope depths are kept in two
+        parallel lists indexed by stack slot, and each name maps to the stack of
+        slots declared with it, innermost last."""
         self.enclosing = composer
         self.fun = None  # type: Optional[function.Function]
-        self.locals = None  # type: Optional[List[Local]]
+        self.bytecode = None  # type: Optional[chunk.Chunk]
+        self.local_names = []  # type: List[Optional[scanner.Source]]
+        self.local_depths = []  # type: List[int]
+        self.local_slots = {}  # type: Dict[scanner.Source, List[int]]
         self.local_count = 0
         self.scope_depth = 0
+        self.number_constants = {}  # type: Dict[str, int]
 
 
 def init_compiler(processor, function_type, composer=None):
@@ -95,48 +169,62 @@ def init_compiler(processor, function_type, composer=None):
     """Initialize new compiler."""
     composer = Compiler(composer)
     composer.fun = function.init_function(function_type)
-    composer.locals = [Local(None, 0) for _ in range(UINT8_COUNT)]
+    composer.bytecode = composer.fun.bytecode
 
     if function_type == function.FunctionType.TYPE_FUNCTION:
         assert processor.previous is not None
         composer.fun.name = processor.previous.source
 
-    token = scanner.Token(scanner.TokenType.TOKEN_NIL, 0, 0, None, 0)
-    local = Local(token, 0)
-    composer.locals[composer.local_count] = local
+    # Slot zero is reserved for the function being called and has no name
+    composer.local_names.append(None)
+    composer.local_depths.append(0)
     composer.local_count += 1
 
     return composer
 
 
 class Parser():
+    __slots__ = (
+        "searcher",
+        "current",
+        "previous",
+        "had_error",
+        "panic_mode",
+        "reported_error",
+        "debug_level",
+    )
+
     def __init__(self):
         # type: () -> None
         """Stores scanner and instructions."""
+        self.searcher = None  # type: Optional[scanner.Scanner]
         self.current = None  # type: Optional[scanner.Token]
         self.previous = None  # type: Optional[scanner.Token]
         self.had_error = False
         self.panic_mode = False
+        self.reported_error = False
         self.debug_level = 0
 
 
-def init_parser(debug_level):
-    # type: (int) -> Parser
-    """Initialize new parser."""
+def init_parser(searcher, debug_level):
+    # type: (scanner.Scanner, int) -> Parser
+    """Initialize new parser reading tokens from given scanner."""
     processor = Parser()
+    processor.searcher = searcher
     processor.debug_level = debug_level
 
     return processor
 
 
 @expose
-def error_at(processor, searcher, token, message):
-    # type: (Parser, scanner.Scanner, scanner.Token, str) -> Parser
+def error_at(processor, token, message):
+    # type: (Parser, scanner.Token, str) -> None
     """Expose error and details pertaining to error."""
     if processor.panic_mode:
-        return processor
+        return
 
     processor.panic_mode = True
+    processor.reported_error = True
 
     print("[line {}] Error".format(token.line), end=" ")
 
@@ -145,249 +233,287 @@ def error_at(processor, searcher, token, message):
     elif token.token_type == scanner.TokenType.TOKEN_ERROR:
         pass
     else:
-        assert searcher.source is not None
-        current_token = searcher.source[token.start:token.start + token.length]
-        print("at {}".format(current_token))
-
-    return processor
+        print("at {}".format(token.source))
 
 
 @expose
-def error(processor, searcher, message):
-    # type: (Parser, scanner.Scanner, str) -> Parser
+def error(processor, message):
+    # type: (Parser, str) -> None
     """Extract error location from token just consumed."""
-    return error_at(processor, searcher, processor.previous, message)
+    error_at(processor, processor.previous, message)
 
 
 @expose
-def error_at_current(processor, searcher, message):
-    # type: (Parser, scanner.Scanner, str) -> Parser
+def error_at_current(processor, message):
+    # type: (Parser, str) -> None
     """Extract error location from current token."""
-    return error_at(processor, searcher, processor.current, message)
+    error_at(processor, processor.current, message)
 
 
-@expose
-def advance(processor, searcher):
-    # type: (Parser, scanner.Scanner) -> Parser
+def advance(processor):
+    # type: (Parser) -> None
     """Steps through token stream and stores for later use."""
     processor.previous = processor.current
+    searcher = processor.searcher
+    scan_token = scanner.scan_token
 
+    assert searcher is not None
     while True:
-        current_token = scanner.scan_token(searcher)
+        current_token = scan_token(searcher)
         processor.current = current_token
+        token_type = current_token.token_type
 
-        if processor.debug_level >= 2 and current_token.token_type:
-            print(current_token.token_type)
+        # Compiled out under python -O
+        if __debug__ and processor.debug_level >= 2:
+            print("TokenType." + token_type.name)
 
-        if current_token.token_type != scanner.TokenType.TOKEN_ERROR:
+        if token_type is not TOKEN_ERROR:
             break
 
-        processor = error_at_current(processor, searcher, current_token.source)
+        error_at_current(processor, current_token.source)
 
-    return processor
 
-
-@expose
-def consume(processor, searcher, token_type, message):
-    # type: (Parser, scanner.Scanner, scanner.TokenType, str) -> Parser
+def consume(processor, token_type, message):
+    # type: (Parser, scanner.TokenType, str) -> None
     """Reads the next token and validates token has expected type."""
-    assert processor.current is not None
-    if processor.current.token_type == token_type:
-        return advance(processor, searcher)
+    current = processor.current
 
-    return error_at_current(processor, searcher, message)
+    assert current is not None
+    if current.token_type == token_type:
+        advance(processor)
+        return
+
+    error_at_current(processor, message)
 
 
-@expose
 def check(processor, token_type):
     # type: (Parser, scanner.TokenType) -> bool
     """Checks current_token has given type."""
-    assert processor.current is not None
-    return processor.current.token_type == token_type
+    current = processor.current
 
+    assert current is not None
+    return current.token_type == token_type
 
-@expose
-def match(processor, searcher, token_type):
-    # type: (Parser, scanner.Scanner, scanner.TokenType) -> Tuple[Parser, bool]
+
+def match(processor, token_type):
+    # type: (Parser, scanner.TokenType) -> bool
     """If current token has given type, consume token and return True."""
-    if not check(processor, token_type):
-        return processor, False
+    current = processor.current
 
-    return advance(processor, searcher), True
+    assert current is not None
+    if current.token_type != token_type:
+        return False
+
+    advance(processor)
+    return True
 
 
-@expose
 def emit_byte(processor, composer, byte):
-    # type: (Parser, Compiler, chunk.Byte) -> Tuple[Parser, Compiler]
+    # type: (Parser, Compiler, chunk.Byte) -> None
     """Append single byte to bytecode."""
-    assert composer.fun is not None
-    assert composer.fun.bytecode is not None
-    assert processor.previous is not None
-    composer.fun.bytecode = chunk.write_chunk(composer.fun.bytecode, byte, processor.previous.line)
+    bytecode = composer.bytecode
+    previous = processor.previous
 
-    return processor, composer
+    assert bytecode is not None
+    assert previous is not None
+    chunk.write_chunk(bytecode, byte, previous.line)
 
 
-@expose
 def emit_bytes(processor, composer, byte1, byte2):
-    # type: (Parser, Compiler, chunk.Byte, chunk.Byte) -> Tuple[Parser, Compiler]
+    # type: (Parser, Compiler, chunk.Byte, chunk.Byte) -> None
     """Append two bytes to bytecode."""
-    processor, composer = emit_byte(processor, composer, byte1)
-    return emit_byte(processor, composer, byte2)
+    bytecode = composer.bytecode
+    previous = processor.previous
+
+    assert bytecode is not None
+    assert previous is not None
+    chunk.extend_chunk(bytecode, [byte1, byte2], previous.line)
 
 
 @expose
 def emit_return(processor, composer):
-    # type: (Parser, Compiler) -> Tuple[Parser, Compiler]
+    # type: (Parser, Compiler) -> None
     """Clean up after complete compilation stage."""
-    processor, composer = emit_byte(processor, composer, chunk.OpCode.OP_NIL)
-    return emit_byte(processor, composer, chunk.OpCode.OP_RETURN)
+    emit_bytes(processor, composer, chunk.OpCode.OP_NIL, chunk.OpCode.OP_RETURN)
 
 
-@expose
-def make_constant(processor, composer, searcher, val):
-    # type: (Parser, Compiler, scanner.Scanner, value.Value) -> Tuple[Parser, Compiler, Optional[value.Value]]
+def make_constant(processor, composer, val):
+    # type: (Parser, Compiler, value.Value) -> Optional[int]
     """Add value to constant table."""
-    assert composer.fun is not None
-    assert composer.fun.bytecode is not None
-    composer.fun.bytecode, constant = chunk.add_constant(composer.fun.bytecode, val)
+    assert composer.bytecode is not None
+    _, constant = chunk.add_constant(composer.bytecode, val)
 
     if constant > UINT8_MAX:
-        processor = error(processor, searcher, "Too many constants in one chunk.")
-        return processor, composer, None
+        error(processor, "Too many constants in one chunk.")
+        return None
 
-    return processor, composer, constant
+    return constant
 
 
-@expose
-def emit_constant(processor, composer, searcher, val):
-    # type: (Parser, Compiler, scanner.Scanner, value.Value) -> Tuple[Parser, Compiler]
+def emit_constant(processor, composer, val):
+    # type: (Parser, Compiler, value.Value) -> None
     """Append constant to bytecode."""
-    processor, composer, constant = make_constant(processor, composer, searcher, val)
+    constant = make_constant(processor, composer, val)
 
     assert constant is not None
-    return emit_bytes(processor, composer, chunk.OpCode.OP_CONSTANT, constant)
+    emit_bytes(processor, composer, chunk.OpCode.OP_CONSTANT, constant)
+
+
+def emit_number(processor, composer, val, line):
+    # type: (Parser, Compiler, float, int) -> None
+    """Append number constant to bytecode at given line. Repeated numbers reuse
+    the constant added at first occurrence in this chunk."""
+    key = repr(val)
+    constant = composer.number_constants.get(key)
+
+    if constant is None:
+        constant = make_constant(processor, composer, val)
+
+        assert constant is not None
+        composer.number_constants[key] = constant
+
+    assert composer.bytecode is not None
+    chunk.extend_chunk(composer.bytecode, [chunk.OpCode.OP_CONSTANT, constant], line)
+
+
+def emit_numbers(processor, composer, numbers):
+    # type: (Parser, Compiler, List[Tuple[float, int]]) -> None
+    """Append number literals held back for folding, and clear them."""
+    for val, line in numbers:
+        emit_number(processor, composer, val, line)
+
+    del numbers[:]
+
+
+def fold_operator(processor, composer, numbers, opcode):
+    # type: (Parser, Compiler, List[Tuple[float, int]], chunk.OpCode) -> None
+    """Apply operator at compile time when its operands are number literals held
+    back at the top of the stack, otherwise emit those literals and the operator.
+    Division by zero is left to fail at runtime."""
+    if opcode == chunk.OpCode.OP_NEGATE:
+        if numbers:
+            val, line = numbers[-1]
+            numbers[-1] = (-val, line)
+            return
+
+    elif len(numbers) >= 2:
+        b, _ = numbers[-1]
+        a, line = numbers[-2]
+        fold_operation = FOLD_OPERATIONS[opcode]
+
+        assert fold_operation is not None
+        if b != 0 or opcode != chunk.OpCode.OP_DIVIDE:
+            numbers.pop()
+            numbers[-1] = (fold_operation(a, b), line)
+            return
+
+    emit_numbers(processor, composer, numbers)
+    emit_byte(processor, composer, opcode)
 
 
 @expose
 def end_compiler(processor, composer):
-    # type: (Parser, Compiler) -> Tuple[Parser, Optional[Compiler], function.Function]
+    # type: (Parser, Compiler) -> Tuple[Optional[Compiler], function.Function]
     """Implement end of expression."""
-    processor, composer = emit_return(processor, composer)
+    emit_return(processor, composer)
 
-    assert composer is not None
     fun = composer.fun
     enclosing = composer.enclosing
 
     assert fun is not None
-    return processor, enclosing, fun
+    return enclosing, fun
 
 
 @expose
 def begin_scope(processor, composer):
-    # type: (Parser, Compiler) -> Compiler
+    # type: (Parser, Compiler) -> None
     """Enter a new local scope."""
     composer.scope_depth += 1
-    return composer
 
 
 @expose
 def end_scope(processor, composer):
-    # type: (Parser, Compiler) -> Tuple[Parser, Compiler]
+    # type: (Parser, Compiler) -> None
     """Exit local scope."""
     composer.scope_depth -= 1
 
-    while True:
-        is_positive = composer.local_count > 0
-
-        assert composer.locals is not None
-        depth = composer.locals[composer.local_count - 1].depth
-        is_over_scope = depth > composer.scope_depth
+    local_names = composer.local_names
+    local_depths = composer.local_depths
+    local_slots = composer.local_slots
+    pop_count = 0
 
-        if not is_positive or not is_over_scope:
+    while composer.local_count > 0:
+        if local_depths[composer.local_count - 1] <= composer.scope_depth:
             break
 
-        processor, composer = emit_byte(processor, composer, chunk.OpCode.OP_POP)
-        composer.local_count -= 1
+        name = local_names.pop()
+        local_depths.pop()
 
-    return processor, composer
+        assert name is not None
+        slots = local_slots[name]
+        slots.pop()
 
+        if not slots:
+            del local_slots[name]
 
-@expose
-def binary(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
-    """Implements infix parser for binary operations."""
-    # Remember the operator
-    assert processor.previous is not None
-    operator_type = processor.previous.token_type
+        composer.local_count -= 1
+        pop_count += 1
 
-    # Compile the right operand.
-    rule = get_rule(operator_type)
+    if pop_count == 0:
+        return
 
-    # Get precedence which has 1 priority level above precedence of current rule
-    precedence = Precedence(rule.precedence.value + 1)
-    processor, composer = parse_precedence(processor, composer, searcher, precedence)
+    bytecode = composer.bytecode
+    previous = processor.previous
 
-    if operator_type == scanner.TokenType.TOKEN_PLUS:
-        return emit_byte(processor, composer, chunk.OpCode.OP_ADD)
-    elif operator_type == scanner.TokenType.TOKEN_MINUS:
-        return emit_byte(processor, composer, chunk.OpCode.OP_SUBTRACT)
-    elif operator_type == scanner.TokenType.TOKEN_STAR:
-        return emit_byte(processor, composer, chunk.OpCode.OP_MULTIPLY)
-    elif operator_type == scanner.TokenType.TOKEN_SLASH:
-        return emit_byte(processor, composer, chunk.OpCode.OP_DIVIDE)
+    assert bytecode is not None
+    assert previous is not None
 
-    return processor, composer
+    if pop_count == 1:
+        chunk.write_chunk(bytecode, chunk.OpCode.OP_POP, previous.line)
+    else:
+        chunk.extend_chunk(bytecode, [chunk.OpCode.OP_POPN, pop_count], previous.line)
 
 
-@expose
-def call(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
+def call(processor, composer):
+    # type: (Parser, Compiler) -> None
     """Compile arguments list and emit call instruction."""
-    processor, composer, arg_count = argument_list(processor, composer, searcher)
-    return emit_bytes(processor, composer, chunk.OpCode.OP_CALL, arg_count)
+    arg_count = argument_list(processor, composer)
+    emit_bytes(processor, composer, chunk.OpCode.OP_CALL, arg_count)
 
 
-@expose
-def expression(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
+def expression(processor, composer):
+    # type: (Parser, Compiler) -> None
     """Compiles expression."""
-    return parse_precedence(processor, composer, searcher, Precedence.PREC_ASSIGNMENT)
+    parse_precedence(processor, composer, Precedence.PREC_ASSIGNMENT)
 
 
 @expose
-def block(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
+def block(processor, composer):
+    # type: (Parser, Compiler) -> None
     """Compile block within scope."""
     while True:
-        is_right_brace = check(processor, scanner.TokenType.TOKEN_RIGHT_BRACE)
-        is_eof = check(processor, scanner.TokenType.TOKEN_EOF)
+        current = processor.current
 
-        if is_right_brace or is_eof:
-            break
+        assert current is not None
+        token_type = current.token_type
 
-        processor, composer = declaration(processor, composer, searcher)
+        if token_type == TOKEN_RIGHT_BRACE or token_type == TOKEN_EOF:
+            break
 
-    processor = consume(
-        processor,
-        searcher,
-        scanner.TokenType.TOKEN_RIGHT_BRACE,
-        "Expect '}' after block.",
-    )
+        declaration(processor, composer)
 
-    return processor, composer
+    consume(processor, TOKEN_RIGHT_BRACE, "Expect '}' after block.")
 
 
-def parse_function(processor, composer, searcher, function_type):
-    # type: (Parser, Compiler, scanner.Scanner, function.FunctionType) -> Tuple[Parser, Compiler]
+def parse_function(processor, composer, function_type):
+    # type: (Parser, Compiler, function.FunctionType) -> None
     """Compiles the parameter list and block body of the funtion."""
     composer = init_compiler(processor, function_type, composer)
-    composer = begin_scope(processor, composer)
+    begin_scope(processor, composer)
 
     # Compile the parameter list
-    processor = consume(
+    consume(
         processor,
-        searcher,
         scanner.TokenType.TOKEN_LEFT_PAREN,
         "Expect '(' after function name.",
     )
@@ -398,498 +524,496 @@ def parse_function(processor, composer, searcher, function_type):
             composer.fun.arity += 1
 
             if composer.fun.arity > 255:
-                processor = error_at_current(
-                    processor,
-                    searcher,
-                    "Can't have more than 255 parameters.",
-                )
-
-            processor, composer = parse_variable(
-                processor,
-                composer,
-                searcher,
-                "Expect parameter name.",
-            )
-
-            composer = define_variable(processor, composer)
-            processor, condition = match(processor, searcher, scanner.TokenType.TOKEN_COMMA)
-
-            if not condition:
+                error_at_current(processor, "Can't have more than 255 parameters.")
+
+            parse_variable(processor, composer, "Expect parameter name.")
+            define_variable(processor, composer)
+
+            if not match(processor, scanner.TokenType.TOKEN_COMMA):
                 break
 
-    processor = consume(
+    consume(
         processor,
-        searcher,
         scanner.TokenType.TOKEN_RIGHT_PAREN,
         "Expect ')' after parameters.",
     )
 
     # The body
-    processor = consume(
+    consume(
         processor,
-        searcher,
         scanner.TokenType.TOKEN_LEFT_BRACE,
         "Expect '{' before function body.",
     )
 
-    processor, composer = block(processor, composer, searcher)
+    block(processor, composer)
 
     # Create the function object
-    processor, composer, fun = end_compiler(processor, composer)
-    processor, composer, constant = make_constant(processor, composer, searcher, fun)
+    enclosing, fun = end_compiler(processor, composer)
 
-    return emit_bytes(processor, composer, chunk.OpCode.OP_CONSTANT, constant)
+    assert enclosing is not None
+    constant = make_constant(processor, enclosing, fun)
+
+    assert constant is not None
+    emit_bytes(processor, enclosing, chunk.OpCode.OP_CONSTANT, constant)
 
 
 @expose
-def function_declaration(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
+def function_declaration(processor, composer):
+    # type: (Parser, Compiler) -> None
     """Declare function when corresponding token matched."""
-    processor, composer = parse_variable(processor, composer, searcher, "Expect function name.")
-    composer = mark_initialized(processor, composer)
+    parse_variable(processor, composer, "Expect function name.")
+    mark_initialized(processor, composer)
 
-    processor, composer = parse_function(
-        processor,
-        composer,
-        searcher,
-        function.FunctionType.TYPE_FUNCTION,
-    )
-
-    composer = define_variable(processor, composer)
-    return processor, composer
+    parse_function(processor, composer, function.FunctionType.TYPE_FUNCTION)
+    define_variable(processor, composer)
 
 
 @expose
-def variable_declaration(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
+def variable_declaration(processor, composer):
+    # type: (Parser, Compiler) -> None
     """Declare variable when corresponding token matched."""
-    processor, composer = parse_variable(processor, composer, searcher, "Expect variable name.")
-    processor, condition = match(processor, searcher, scanner.TokenType.TOKEN_EQUAL)
+    parse_variable(processor, composer, "Expect variable name.")
+    condition = match(processor, scanner.TokenType.TOKEN_EQUAL)
 
     assert condition
-    processor, composer = expression(processor, composer, searcher)
+    expression(processor, composer)
 
-    processor = consume(
+    consume(
         processor,
-        searcher,
         scanner.TokenType.TOKEN_SEMICOLON,
         "Expect ';' after variable declaration.",
     )
 
-    composer = define_variable(processor, composer)
-    return processor, composer
+    define_variable(processor, composer)
 
 
 @expose
-def expression_statement(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
+def expression_statement(processor, composer):
+    # type: (Parser, Compiler) -> None
     """Evaluates expression statement prior to semicolon."""
-    processor, composer = expression(processor, composer, searcher)
-
-    processor = consume(
-        processor,
-        searcher,
-        scanner.TokenType.TOKEN_SEMICOLON,
-        "Expect ';' after expression.",
-    )
-
-    return emit_byte(processor, composer, chunk.OpCode.OP_POP)
+    expression(processor, composer)
+    consume(processor, scanner.TokenType.TOKEN_SEMICOLON, "Expect ';' after expression.")
+    emit_byte(processor, composer, chunk.OpCode.OP_POP)
 
 
 @expose
-def print_statement(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
+def print_statement(processor, composer):
+    # type: (Parser, Compiler) -> None
     """Evaluates expression and prints result."""
-    processor, composer = expression(processor, composer, searcher)
-
-    processor = consume(
-        processor,
-        searcher,
-        scanner.TokenType.TOKEN_SEMICOLON,
-        "Expect ';' after expression.",
-    )
-
-    return emit_byte(processor, composer, chunk.OpCode.OP_PRINT)
+    expression(processor, composer)
+    consume(processor, scanner.TokenType.TOKEN_SEMICOLON, "Expect ';' after expression.")
+    emit_byte(processor, composer, chunk.OpCode.OP_PRINT)
 
 
 @expose
-def return_statement(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
+def return_statement(processor, composer):
+    # type: (Parser, Compiler) -> None
     """Allows function to return non-nil value."""
     assert composer.fun is not None
     if composer.fun.function_type == function.FunctionType.TYPE_SCRIPT:
-        processor = error(processor, searcher, "Can't return from top-level code.")
+        error(processor, "Can't return from top-level code.")
 
-    processor, condition = match(processor, searcher, scanner.TokenType.TOKEN_SEMICOLON)
+    if match(processor, scanner.TokenType.TOKEN_SEMICOLON):
+        emit_return(processor, composer)
+        return
 
-    if condition:
-        return emit_return(processor, composer)
+    expression(processor, composer)
 
-    processor, composer = expression(processor, composer, searcher)
-
-    processor = consume(
+    consume(
         processor,
-        searcher,
         scanner.TokenType.TOKEN_SEMICOLON,
         "Expect ';' after return value.",
     )
 
-    return emit_byte(processor, composer, chunk.OpCode.OP_RETURN)
+    emit_byte(processor, composer, chunk.OpCode.OP_RETURN)
 
 
 @expose
-def synchronize(processor, searcher):
-    # type: (Parser, scanner.Scanner) -> Parser
+def synchronize(processor):
+    # type: (Parser) -> None
     """Skip tokens until statement boundary reached. This allows multiple errors
     to be exposed, instead of stopping after the first one."""
     processor.panic_mode = False
 
-    assert processor.current is not None
-    assert processor.previous is not None
+    current = processor.current
+    previous = processor.previous
 
-    while processor.current.token_type != scanner.TokenType.TOKEN_EOF:
-        if processor.previous.token_type == scanner.TokenType.TOKEN_SEMICOLON:
-            break
+    assert current is not None
+    assert previous is not None
 
-        elif processor.current.token_type == scanner.TokenType.TOKEN_RETURN:
+    while current.token_type != TOKEN_EOF:
+        if SYNC_STOP_PREVIOUS[previous.token_type] or SYNC_STOP_CURRENT[current.token_type]:
             break
 
-        processor = advance(processor, searcher)
+        advance(processor)
+        previous = current
+        current = processor.current
 
-    return processor
+        assert current is not None
 
 
 @expose
-def declaration(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
-    """Compiles declarations until end of source code reached."""
-    def wrapper(processor, composer, searcher):
-        #
-        if processor.panic_mode:
-            processor = synchronize(processor, searcher)
-        return processor, composer
-
-    processor, condition = match(processor, searcher, scanner.TokenType.TOKEN_FUN)
-
-    if condition:
-        processor, composer = function_declaration(processor, composer, searcher)
-        return wrapper(processor, composer, searcher)
-
-    processor, condition = match(processor, searcher, scanner.TokenType.TOKEN_VAR)
-
-    if condition:
-        processor, composer = variable_declaration(processor, composer, searcher)
-        return wrapper(processor, composer, searcher)
+def declaration(processor, composer):
+    # type: (Parser, Compiler) -> None
+    """Compiles declarations until end of source code reached. Declarations and
+    statements starting with a keyword or brace are dispatched on that token,
+    anything else is an expression statement."""
+    current = processor.current
+
+    assert current is not None
+    handler = STATEMENT_HANDLERS[current.token_type]
+
+    if handler is None:
+        expression_statement(processor, composer)
+    else:
+        advance(processor)
+        handler(processor, composer)
 
-    processor, composer = statement(processor, composer, searcher)
-    return wrapper(processor, composer, searcher)
+    if processor.panic_mode:
+        synchronize(processor)
 
 
 @expose
-def statement(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
-    """Handler for statements."""
-    processor, condition = match(processor, searcher, scanner.TokenType.TOKEN_PRINT)
-
-    if condition:
-        processor, composer = print_statement(processor, composer, searcher)
-        return processor, composer
-
-    processor, condition = match(processor, searcher, scanner.TokenType.TOKEN_RETURN)
+def block_statement(processor, composer):
+    # type: (Parser, Compiler) -> None
+    """Compile block within its own local scope."""
+    begin_scope(processor, composer)
+    block(processor, composer)
+    end_scope(processor, composer)
 
-    if condition:
-        processor, composer = return_statement(processor, composer, searcher)
-        return processor, composer
 
-    processor, condition = match(processor, searcher, scanner.TokenType.TOKEN_LEFT_BRACE)
+def named_variable(processor, composer, token):
+    # type: (Parser, Compiler, scanner.Token) -> None
+    """ Set local variable."""
+    arg = resolve_local(processor, composer, token)
 
-    if condition:
-        composer = begin_scope(processor, composer)
-        processor, composer = block(processor, composer, searcher)
-        return end_scope(processor, composer)
+    # Unresolved names are emitted as a slot the VM can never index
+    if arg == -1:
+        arg = UNRESOLVED_SLOT
 
-    processor, composer = expression_statement(processor, composer, searcher)
-    return processor, composer
+    if match(processor, scanner.TokenType.TOKEN_EQUAL):
+        expression(processor, composer)
+        emit_bytes(processor, composer, chunk.OpCode.OP_SET_LOCAL, arg)
+        return
 
+    emit_bytes(processor, composer, chunk.OpCode.OP_GET_LOCAL, arg)
 
-@expose
-def grouping(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
-    """Compiles expression between parentheses and consumes parentheses."""
-    processor, composer = expression(processor, composer, searcher)
 
-    processor = consume(
-        processor,
-        searcher,
-        scanner.TokenType.TOKEN_RIGHT_PAREN,
-        "Expect ')' after expression.",
-    )
-
-    return processor, composer
-
-
-@expose
-def number(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
-    """Append number literal to bytecode."""
-    assert processor.previous is not None
-    assert processor.previous.source is not None
-    val = float(processor.previous.source)
+def variable(processor, composer):
+    # type: (Parser, Compiler) -> None
+    """Append variable to bytecode."""
+    previous = processor.previous
 
-    return emit_constant(processor, composer, searcher, val)
+    assert previous is not None
+    named_variable(processor, composer, previous)
 
 
-@expose
-def named_variable(processor, composer, searcher, token):
-    # type: (Parser, Compiler, scanner.Scanner, scanner.Token) -> Tuple[Parser, Compiler]
-    """ Set local variable."""
-    processor, arg = resolve_local(processor, composer, searcher, token)
-    processor, condition = match(processor, searcher, scanner.TokenType.TOKEN_EQUAL)
+def parse_precedence(processor, composer, precedence):
+    # type: (Parser, Compiler, int) -> None
+    """Starts at current token and parses expression at given precedence level
+    or higher. Operators and groupings waiting on their operand are kept on an
+    explicit stack instead of recursing. Number literals at the top of the stack
+    are held back so operators on them can be folded."""
+    if __debug__ and processor.debug_level >= 3:
+        print("  parse_precedence")
+
+    # Each pending operator is stored as its opcode with the minimum precedence
+    # to restore once its operand is complete. Open groupings are stored as None.
+    operators = []  # type: List[Tuple[Optional[chunk.OpCode], int]]
+    min_precedence = int(precedence)
+
+    # Number literals not yet emitted, stored with their line
+    numbers = []  # type: List[Tuple[float, int]]
+
+    prefix_kinds = PREFIX_KINDS
+    prefix_rules = PREFIX_RULES
+    infix_kinds = INFIX_KINDS
+    infix_rules = INFIX_RULES
+    precedence_values = PRECEDENCE_VALUES
 
-    if condition:
-        processor, composer = expression(processor, composer, searcher)
-        return emit_bytes(processor, composer, chunk.OpCode.OP_SET_LOCAL, arg)
+    while True:
+        advance(processor)
 
-    return emit_bytes(processor, composer, chunk.OpCode.OP_GET_LOCAL, arg)
+        previous = processor.previous
 
+        assert previous is not None
+        operator_type = previous.token_type
+        prefix_kind = prefix_kinds[operator_type]
 
-@expose
-def variable(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
-    """Append variable to bytecode."""
-    return named_variable(processor, composer, searcher, processor.previous)
+        if prefix_kind == PREFIX_UNARY:
+            # Operand is parsed at unary precedence before the operator is emitted
+            operators.append((UNARY_OPCODES[operator_type], min_precedence))
+            min_precedence = Precedence.PREC_UNARY
+            continue
 
+        if prefix_kind == PREFIX_GROUPING:
+            # Grouped expression is parsed from the lowest precedence
+            operators.append((None, min_precedence))
+            min_precedence = Precedence.PREC_ASSIGNMENT
+            continue
 
-@expose
-def unary(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
-    """Consumes leading minus and appends negated value."""
-    assert processor.previous is not None
-    operator_type = processor.previous.token_type
+        if prefix_kind == PREFIX_NUMBER:
+            assert previous.source is not None
+            numbers.append((float(previous.source), previous.line))
+        elif prefix_kind == RULE_NONE:
+            error(processor, "Expect expression")
 
-    # Compile the operand
-    processor, composer = parse_precedence(processor, composer, searcher, Precedence.PREC_UNARY)
+            if not operators:
+                emit_numbers(processor, composer, numbers)
+                return
 
-    # Emit the operator instruction
-    if operator_type == scanner.TokenType.TOKEN_MINUS:
-        processor, composer = emit_byte(processor, composer, chunk.OpCode.OP_NEGATE)
+            opcode, min_precedence = operators.pop()
+            complete_operator(processor, composer, numbers, opcode)
+        else:
+            prefix_rule = prefix_rules[operator_type]
 
-    return processor, composer
+            assert prefix_rule is not None
+            emit_numbers(processor, composer, numbers)
+            prefix_rule(processor, composer)
 
+        while True:
+            current = processor.current
 
-@expose
-def parse_precedence(processor, composer, searcher, precedence):
-    # type: (Parser, Compiler, scanner.Scanner, Precedence) -> Tuple[Parser, Compiler]
-    """Starts at current token and parses expression at given precedence level
-    or higher."""
-    processor = advance(processor, searcher)
+            assert current is not None
+            current_precedence = precedence_values[current.token_type]
 
-    assert processor.previous is not None
-    prefix_rule = get_rule(processor.previous.token_type).prefix
+            # Next token binds looser, so operand of pending operator is complete
+            if current_precedence < min_precedence:
+                if not operators:
+                    emit_numbers(processor, composer, numbers)
+                    return
 
-    if prefix_rule is None:
-        processor = error(processor, searcher, "Expect expression")
-        return processor, composer
+                opcode, min_precedence = operators.pop()
+                complete_operator(processor, composer, numbers, opcode)
+                continue
 
-    processor, composer = prefix_rule(processor, composer, searcher)
+            advance(processor)
 
-    assert processor.current is not None
-    while precedence.value <= get_rule(processor.current.token_type).precedence.value:
-        processor = advance(processor, searcher)
+            # Token just consumed is the one previously held as current
+            operator_type = current.token_type
 
-        assert processor.previous is not None
-        infix_rule = get_rule(processor.previous.token_type).infix
+            if infix_kinds[operator_type] == INFIX_BINARY:
+                # Right operand has 1 priority level above precedence of operator
+                operators.append((BINARY_OPCODES[operator_type], min_precedence))
+                min_precedence = current_precedence + 1
+                break
 
-        assert infix_rule is not None
-        processor, composer = infix_rule(processor, composer, searcher)
+            infix_rule = infix_rules[operator_type]
 
-    return processor, composer
+            assert infix_rule is not None
+            emit_numbers(processor, composer, numbers)
+            infix_rule(processor, composer)
 
 
-def identifiers_equal(a, b):
-    # type: (Optional[scanner.Token], Optional[scanner.Token]) -> bool
-    """Checks if two tokens are equal."""
-    if not a or not b or a.length != b.length:
-        return False
+def complete_operator(processor, composer, numbers, opcode):
+    # type: (Parser, Compiler, List[Tuple[float, int]], Optional[chunk.OpCode]) -> None
+    """Finish operator popped from the parse_precedence stack once its operand is
+    complete. An open grouping is closed by its right parenthesis."""
+    if opcode is None:
+        consume(processor, scanner.TokenType.TOKEN_RIGHT_PAREN, "Expect ')' after expression.")
+        return
 
-    return a.source == b.source
+    fold_operator(processor, composer, numbers, opcode)
 
 
-@expose
-def resolve_local(processor, composer, searcher, token):
-    # type: (Parser, Compiler, scanner.Scanner, scanner.Token) -> Tuple[Parser, int]
+def resolve_local(processor, composer, token):
+    # type: (Parser, Compiler, scanner.Token) -> int
     """Find last declared variable with given identifier."""
-    for i in range(composer.local_count - 1, -1, -1):
-        assert composer.locals is not None
-        local = composer.locals[i]
+    assert token.source is not None
+    slots = composer.local_slots.get(token.source)
+
+    if not slots:
+        return -1
 
-        if identifiers_equal(token, local.token):
-            if local.depth == -1:
-                processor = error(
-                    processor,
-                    searcher,
-                    "Cannot read local variable in its own initializer.",
-                )
+    slot = slots[-1]
 
-            return processor, i
+    if composer.local_depths[slot] == -1:
+        error(processor, "Cannot read local variable in its own initializer.")
 
-    return processor, -1
+    return slot
 
 
 @expose
-def add_local(processor, composer, searcher, token):
-    # type: (Parser, Compiler, scanner.Scanner, scanner.Token) -> Tuple[Parser, Compiler]
+def add_local(processor, composer, token):
+    # type: (Parser, Compiler, scanner.Token) -> None
     """Include local variable to compiler's list in the current scope."""
     if composer.local_count == UINT8_COUNT:
-        return error(processor, searcher, "Too many local variables in function."), composer
-
-    assert composer.locals is not None
-    composer.locals[composer.local_count] = Local(token, composer.scope_depth)
+        error(processor, "Too many local variables in function.")
+        return
+
+    # Locals are allocated as declared rather than preallocated up to UINT8_COUNT
+    assert token.source is not None
+    composer.local_names.append(token.source)
+    composer.local_depths.append(composer.scope_depth)
+    composer.local_slots.setdefault(token.source, []).append(composer.local_count)
     composer.local_count += 1
 
-    return processor, composer
-
 
 @expose
-def declare_variable(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler]
+def declare_variable(processor, composer):
+    # type: (Parser, Compiler) -> None
     """Record the existence of local variable in the compiler."""
     if composer.scope_depth == 0:
-        return processor, composer
+        return
 
     token = processor.previous
 
-    for i in range(composer.local_count - 1, -1, -1):
-        assert composer.locals is not None
-        local = composer.locals[i]
-
-        if local.depth != -1 and local.depth < composer.scope_depth:
-            break
+    assert token is not None
+    assert token.source is not None
+    slots = composer.local_slots.get(token.source)
 
-        if identifiers_equal(token, local.token):
-            processor = error(
-                processor,
-                searcher,
-                "Variable with this name already declared in this scope.",
-            )
+    # Only the innermost local with this name can belong to the current scope
+    if slots:
+        depth = composer.local_depths[slots[-1]]
 
-            return processor, composer
+        if depth == -1 or depth >= composer.scope_depth:
+            error(processor, "Variable with this name already declared in this scope.")
+            return
 
-    assert token is not None
-    return add_local(processor, composer, searcher, token)
+    add_local(processor, composer, token)
 
 
 @expose
-def parse_variable(processor, composer, searcher, error_message):
-    # type: (Parser, Compiler, scanner.Scanner, str) -> Tuple[Parser, Compiler]
+def parse_variable(processor, composer, error_message):
+    # type: (Parser, Compiler, str) -> None
     """Checks next token in local variable declaration is an identifier token."""
-    processor = consume(processor, searcher, scanner.TokenType.TOKEN_IDENTIFIER, error_message)
-    processor, composer = declare_variable(processor, composer, searcher)
+    consume(processor, scanner.TokenType.TOKEN_IDENTIFIER, error_message)
+    declare_variable(processor, composer)
 
     assert composer.scope_depth > 0
-    return processor, composer
 
 
 @expose
 def mark_initialized(processor, composer):
-    # type: (Parser, Compiler) -> Compiler
+    # type: (Parser, Compiler) -> None
     """Mark local variable as initialized once variable set in compiler."""
     assert composer.scope_depth > 0
     local_count = composer.local_count - 1
 
-    assert composer.locals is not None
-    composer.locals[local_count].depth = composer.scope_depth
-
-    return composer
+    composer.local_depths[local_count] = composer.scope_depth
 
 
 @expose
 def define_variable(processor, composer):
-    # type: (Parser, Compiler) -> Compiler
+    # type: (Parser, Compiler) -> None
     """Emit code to store local variable."""
     assert composer.scope_depth > 0
-    return mark_initialized(processor, composer)
+    mark_initialized(processor, composer)
 
 
 @expose
-def argument_list(processor, composer, searcher):
-    # type: (Parser, Compiler, scanner.Scanner) -> Tuple[Parser, Compiler, int]
+def argument_list(processor, composer):
+    # type: (Parser, Compiler) -> int
     """Compile the argument list of a function."""
     arg_count = 0
 
     if not check(processor, scanner.TokenType.TOKEN_RIGHT_PAREN):
         while True:
-            processor, composer = expression(processor, composer, searcher)
+            expression(processor, composer)
 
             if arg_count == 255:
-                processor = error(processor, searcher, "Can't have more than 255 arguments.")
-                return processor, composer, arg_count
+                error(processor, "Can't have more than 255 arguments.")
+                return arg_count
 
             arg_count += 1
-            processor, condition = match(processor, searcher, scanner.TokenType.TOKEN_COMMA)
 
-            if condition:
+            if match(processor, scanner.TokenType.TOKEN_COMMA):
                 break
 
-    processor = consume(
-        processor,
-        searcher,
-        scanner.TokenType.TOKEN_RIGHT_PAREN,
-        "Expect ')' after arguments.",
-    )
+    consume(processor, scanner.TokenType.TOKEN_RIGHT_PAREN, "Expect ')' after arguments.")
 
-    return processor, composer, arg_count
-
-
-def get_rule(token_type):
-    # type: (scanner.TokenType) -> ParseRule
-    """Custom function to convert TokenType to ParseRule. This allows the
-    rule_map to consist of strings, which are then replaced by respective
-    classes in the conversion process."""
-    type_map = {
-        "binary": binary,
-        "call": call,
-        "grouping": grouping,
-        "number": number,
-        "unary": unary,
-        "variable": variable,
-    }
-
-    rule = rule_map[token_type.name]
-
-    assert rule[2] is not None
-    return ParseRule(
-        prefix=None if rule[0] is None else type_map[rule[0]],
-        infix=None if rule[1] is None else type_map[rule[1]],
-        precedence=Precedence[rule[2]],
-    )
+    return arg_count
+
+
+# yapf: disable
+rule_map = {
+    scanner.TokenType.TOKEN_LEFT_PAREN:  (RuleKind.PREFIX_GROUPING, call,                  Precedence.PREC_CALL),
+    scanner.TokenType.TOKEN_RIGHT_PAREN: (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_LEFT_BRACE:  (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_RIGHT_BRACE: (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_COMMA:       (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_MINUS:       (RuleKind.PREFIX_UNARY,    RuleKind.INFIX_BINARY, Precedence.PREC_TERM),
+    scanner.TokenType.TOKEN_PLUS:        (None,                     RuleKind.INFIX_BINARY, Precedence.PREC_TERM),
+    scanner.TokenType.TOKEN_SEMICOLON:   (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_SLASH:       (None,                     RuleKind.INFIX_BINARY, Precedence.PREC_FACTOR),
+    scanner.TokenType.TOKEN_STAR:        (None,                     RuleKind.INFIX_BINARY, Precedence.PREC_FACTOR),
+    scanner.TokenType.TOKEN_EQUAL:       (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_EQUAL_EQUAL: (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_IDENTIFIER:  (variable,                 None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_NUMBER:      (RuleKind.PREFIX_NUMBER,   None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_FUN:         (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_NIL:         (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_PRINT:       (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_RETURN:      (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_VAR:         (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_ERROR:       (None,                     None,                  Precedence.PREC_NONE),
+    scanner.TokenType.TOKEN_EOF:         (None,                     None,                  Precedence.PREC_NONE),
+}  # type: Dict[scanner.TokenType, Tuple[Rule, Rule, Precedence]]
+# yapf: enable
+
+
+def build_rule_table():
+    # type: () -> Tuple[ParseRule, ...]
+    """Convert rule_map into ParseRule objects indexed by TokenType."""
+    return tuple(ParseRule(*rule_map[token_type]) for token_type in scanner.TokenType)
+
+
+RULE_TABLE = build_rule_table()
+
+# Handlers for declarations and statements, indexed by their leading TokenType
+STATEMENT_HANDLERS = [None] * len(scanner.TokenType)  # type: List[Optional[Callable]]
+STATEMENT_HANDLERS[TOKEN_FUN] = function_declaration
+STATEMENT_HANDLERS[TOKEN_VAR] = variable_declaration
+STATEMENT_HANDLERS[TOKEN_PRINT] = print_statement
+STATEMENT_HANDLERS[TOKEN_RETURN] = return_statement
+STATEMENT_HANDLERS[TOKEN_LEFT_BRACE] = block_statement
+
+# Rule columns flattened out of RULE_TABLE for the parse_precedence loop
+PREFIX_KINDS = tuple(int(rule.prefix_kind) for rule in RULE_TABLE)
+PREFIX_RULES = tuple(rule.prefix for rule in RULE_TABLE)  # type: Tuple[Optional[RuleFunction], ...]
+INFIX_KINDS = tuple(int(rule.infix_kind) for rule in RULE_TABLE)
+INFIX_RULES = tuple(rule.infix for rule in RULE_TABLE)  # type: Tuple[Optional[RuleFunction], ...]
+PRECEDENCE_VALUES = tuple(rule.precedence_value for rule in RULE_TABLE)
+
+
+# Compiled scripts by source, least recently used first
+compile_cache = collections.OrderedDict()  # type: collections.OrderedDict[scanner.Source, function.Function]
 
 
 def compile(source, debug_level):
     # type: (scanner.Source, int) -> Optional[function.Function]
-    """Compiles source code into tokens."""
+    """Compiles source code into tokens. Scripts compiled without debug output
+    or errors are cached, and a copy is returned when the same source is
+    compiled again since the VM frees the chunks it runs."""
+    if debug_level == 0 and source in compile_cache:
+        compile_cache.move_to_end(source)
+        return copy.deepcopy(compile_cache[source])
+
     searcher = scanner.init_scanner(source)
-    processor = init_parser(debug_level)
+    processor = init_parser(searcher, debug_level)
     composer = init_compiler(processor, function.FunctionType.TYPE_SCRIPT)
 
-    if debug_level >= 2:
+    if __debug__ and debug_level >= 2:
         print("\n== tokens ==")
 
-    processor = advance(processor, searcher)
+    advance(processor)
 
-    while True:
-        processor, condition = match(processor, searcher, scanner.TokenType.TOKEN_EOF)
+    current = processor.current
+    assert current is not None
 
-        if condition:
-            break
+    # Check the token type inline rather than calling match per declaration.
+    while current.token_type is not TOKEN_EOF:
+        declaration(processor, composer)
+        current = processor.current
+        assert current is not None
 
-        processor, composer = declaration(processor, composer, searcher)
+    # Consume the EOF token as match would have.
+    advance(processor)
 
-    processor, composer, fun = end_compiler(processor, composer)
+    enclosing, fun = end_compiler(processor, composer)
 
-    # Final composer returned is the composer.enclosing of first composer initialized, check
-    # composer is indeed None.
-    assert composer is None
+    # Enclosing compiler of the first compiler initialized should be None.
+    assert enclosing is None
 
     if processor.debug_level >= 1:
         debug.disassemble_chunk(fun.bytecode, "script")
@@ -898,4 +1022,10 @@ def compile(source, debug_level):
         function.free_function(fun, fun.function_type)
         return None
 
+    if debug_level == 0 and not processor.reported_error:
+        compile_cache[source] = copy.deepcopy(fun)
+
+        if len(compile_cache) > COMPILE_CACHE_MAX:
+            compile_cache.popitem(last=False)
+
     return fun
@@ -1,94 +1,110 @@
+import array
+import sys
+from typing import Callable, List, Optional, Tuple
+
 import chunk
+import value
+
+Output = List[str]
+Code = bytearray
+Values = List[Optional[value.Value]]
+
+# Operand bytes preformatted to their column width
+OPERANDS = ["{:4d}".format(operand) for operand in range(256)]
 
 
 def disassemble_chunk(bytecode, name):
     # type: (chunk.Chunk, str) -> None
     """Expose each instruction in chunk."""
-    print("\n== {} ==".format(name))
+    # Output is collected here and written once at the end.
+    out = ["\n== {} ==\n".format(name)]  # type: Output
+
+    # Arrays are read and checked once here and shared by every instruction.
+    code = bytecode.code
+    lines = bytecode.lines
+
+    assert bytecode.constants is not None
+    values = bytecode.constants.values
+
+    assert code is not None
+    assert lines is not None
+    assert values is not None
     offset = 0
 
     while offset < bytecode.count:
-        offset = disassemble_instruction(bytecode, offset)
+        offset = disassemble_instruction(out, code, lines, values, offset)
 
-    print("")
+    out.append("\n")
+    sys.stdout.write("".join(out))
 
 
-def constant_instruction(opcode_name, offset, bytecode):
-    # type: (str, int, chunk.Chunk) -> int
+def constant_instruction(out, opcode_name, offset, code, values):
+    # type: (Output, str, int, Code, Values) -> int
     """Utility function for constant instructions."""
-    assert bytecode.code is not None
-    constant = bytecode.code[offset + 1]
+    constant = code[offset + 1]
+    val = values[constant]
 
-    assert bytecode.constants is not None
-    assert bytecode.constants.values is not None
-    assert isinstance(constant, int)
-    val = bytecode.constants.values[constant]
-
-    assert constant is not None
-    print("{:16s} {:4d} '{}'".format(opcode_name, constant, val))
+    out.append("{} {} '{}'\n".format(opcode_name, OPERANDS[constant], val))
     return offset + 2
 
 
-def simple_instruction(opcode_name, offset):
-    # type: (str, int) -> int
+def simple_instruction(out, opcode_name, offset, code, values):
+    # type: (Output, str, int, Code, Values) -> int
     """Utility function for simple instructions."""
-    print("{}".format(opcode_name))
+    out.append(opcode_name + "\n")
     return offset + 1
 
 
-def byte_instruction(opcode_name, offset, bytecode):
-    #
-    """
-    """
-    slot = bytecode.code[offset + 1]
+def byte_instruction(out, opcode_name, offset, code, values):
+    # type: (Output, str, int, Code, Values) -> int
+    """Utility function for instructions with a single byte operand."""
+    slot = code[offset + 1]
 
-    print("{:16s} {:4d}".format(opcode_name, slot))
+    out.append(opcode_name + " " + OPERANDS[slot] + "\n")
     return offset + 2
 
 
-def disassemble_instruction(bytecode, offset):
-    # type: (chunk.Chunk, int) -> int
+def disassemble_instruction(out, code, lines, values, offset):
+    # type: (Output, Code, array.array[int], Values, int) -> int
     """Expose details pertaining to each specific instruction."""
-    print("{:04d}".format(offset), end=" ")
+    out.append("{:04d} ".format(offset))
 
-    assert bytecode.lines is not None
-    line = bytecode.lines[offset]
+    line = lines[offset]
 
-    assert line is not None
-    if offset > 0 and line == bytecode.lines[offset - 1]:
-        print("   |", end=" ")
+    if offset > 0 and line == lines[offset - 1]:
+        out.append("   | ")
     else:
-        print("{:4d}".format(line), end=" ")
-
-    assert bytecode.code is not None
-    instruction = bytecode.code[offset]
-
-    if instruction == chunk.OpCode.OP_CONSTANT:
-        return constant_instruction("OP_CONSTANT", offset, bytecode)
-    elif instruction == chunk.OpCode.OP_NIL:
-        return simple_instruction("OP_NIL", offset)
-    elif instruction == chunk.OpCode.OP_POP:
-        return simple_instruction("OP_POP", offset)
-    elif instruction == chunk.OpCode.OP_GET_LOCAL:
-        return byte_instruction("OP_GET_LOCAL", offset, bytecode)
-    elif instruction == chunk.OpCode.OP_SET_LOCAL:
-        return byte_instruction("OP_SET_LOCAL", offset, bytecode)
-    elif instruction == chunk.OpCode.OP_ADD:
-        return simple_instruction("OP_ADD", offset)
-    elif instruction == chunk.OpCode.OP_SUBTRACT:
-        return simple_instruction("OP_SUBTRACT", offset)
-    elif instruction == chunk.OpCode.OP_MULTIPLY:
-        return simple_instruction("OP_MULTIPLY", offset)
-    elif instruction == chunk.OpCode.OP_DIVIDE:
-        return simple_instruction("OP_DIVIDE", offset)
-    elif instruction == chunk.OpCode.OP_NEGATE:
-        return simple_instruction("OP_NEGATE", offset)
-    elif instruction == chunk.OpCode.OP_PRINT:
-        return simple_instruction("OP_PRINT", offset)
-    elif instruction == chunk.OpCode.OP_CALL:
-        return byte_instruction("OP_CALL", offset, bytecode)
-    elif instruction == chunk.OpCode.OP_RETURN:
-        return simple_instruction("OP_RETURN", offset)
-
-    print("Unknown opcode {}".format(instruction))
+        out.append("{:4d} ".format(line))
+
+    instruction = code[offset]
+
+    if instruction < len(INSTRUCTIONS):
+        entry = INSTRUCTIONS[instruction]
+        assert entry is not None
+
+        instruction_function, opcode_name = entry
+        return instruction_function(out, opcode_name, offset, code, values)
+
+    out.append("Unknown opcode {}\n".format(instruction))
     return offset + 1
+
+
+InstructionFunction = Callable[[Output, str, int, Code, Values], int]
+
+# Instruction handlers and names indexed by opcode, with names of instructions
+# taking an operand already padded to their column width
+INSTRUCTIONS = [None] * len(chunk.OpCode)  # type: List[Optional[Tuple[InstructionFunction, str]]]
+INSTRUCTIONS[chunk.OpCode.OP_CONSTANT] = (constant_instruction, "OP_CONSTANT".ljust(16))
+INSTRUCTIONS[chunk.OpCode.OP_NIL] = (simple_instruction, "OP_NIL")
+INSTRUCTIONS[chunk.OpCode.OP_POP] = (simple_instruction, "OP_POP")
+INSTRUCTIONS[chunk.OpCode.OP_POPN] = (byte_instruction, "OP_POPN".ljust(16))
+INSTRUCTIONS[chunk.OpCode.OP_GET_LOCAL] = (byte_instruction, "OP_GET_LOCAL".ljust(16))
+INSTRUCTIONS[chunk.OpCode.OP_SET_LOCAL] = (byte_instruction, "OP_SET_LOCAL".ljust(16))
+INSTRUCTIONS[chunk.OpCode.OP_ADD] = (simple_instruction, "OP_ADD")
+INSTRUCTIONS[chunk.OpCode.OP_SUBTRACT] = (simple_instruction, "OP_SUBTRACT")
+INSTRUCTIONS[chunk.OpCode.OP_MULTIPLY] = (simple_instruction, "OP_MULTIPLY")
+INSTRUCTIONS[chunk.OpCode.OP_DIVIDE] = (simple_instruction, "OP_DIVIDE")
+INSTRUCTIONS[chunk.OpCode.OP_NEGATE] = (simple_instruction, "OP_NEGATE")
+INSTRUCTIONS[chunk.OpCode.OP_PRINT] = (simple_instruction, "OP_PRINT")
+INSTRUCTIONS[chunk.OpCode.OP_CALL] = (byte_instruction, "OP_CALL".ljust(16))
+INSTRUCTIONS[chunk.OpCode.OP_RETURN] = (simple_instruction, "OP_RETURN")
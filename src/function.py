@@ -10,6 +10,8 @@ class FunctionType(enum.Enum):
 
 
 class Function():
+    __slots__ = ("function_type", "arity", "bytecode", "name")
+
     def __init__(self):
         # type: () -> None
         """Stores function bytecode with name and arity."""
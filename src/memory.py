@@ -1,4 +1,8 @@
-from typing import Any, List, Optional
+from array import array as TypedArray
+from typing import Any, List, Optional, TypeVar
+
+# Each buffer type is returned as itself, so callers keep their own types
+Array = TypeVar("Array", List[Any], bytearray, "TypedArray[Any]")
 
 
 def grow_capacity(capacity):
@@ -10,29 +14,29 @@ def grow_capacity(capacity):
     return capacity * 2
 
 
-def grow_array(array, old_count, new_count):
-    # type: (Optional[List[Any]], int, int) -> Optional[List[Any]]
+def grow_array(values, old_count, new_count):
+    # type: (Array, int, int) -> Optional[Array]
     """Wrapper around reallocate call to grow size of array."""
-    return reallocate(array, old_count, new_count)
+    return reallocate(values, old_count, new_count)
 
 
-def free_array(array, old_count):
-    # type: (Optional[List[Any]], int) -> Optional[List[Any]]
+def free_array(values, old_count):
+    # type: (Array, int) -> Optional[Array]
     """Frees memory."""
-    return reallocate(array, old_count, 0)
+    return reallocate(values, old_count, 0)
 
 
-def reallocate(array, old_size, new_size):
-    # type: (Optional[List[Any]], int, int) -> Optional[List[Any]]
+def reallocate(values, old_size, new_size):
+    # type: (Array, int, int) -> Optional[Array]
     """Handles all dynamic memory management, including allocating memory,
     freeing it and changing the size of an existing allocation."""
     if new_size == 0:
         return None
 
-    # Create empty list if array is None
-    array = array or []
-
-    for i in range(new_size - old_size):
-        array.append(None)
+    # Typed buffers are zero-filled, lists are filled with None
+    if isinstance(values, list):
+        values.extend([None] * (new_size - old_size))
+    else:
+        values.extend(bytes(new_size - old_size))
 
-    return array
+    return values
@@ -1,42 +1,46 @@
 import enum
-from typing import Optional, Tuple
+import re
+import sys
+from typing import List, Optional, Tuple
 
 Source = str
 Character = str
 
 
-class TokenType(enum.Enum):
+class TokenType(enum.IntEnum):
     # Single-character tokens
-    TOKEN_LEFT_PAREN = "TOKEN_LEFT_PAREN"
-    TOKEN_RIGHT_PAREN = "TOKEN_RIGHT_PAREN"
-    TOKEN_LEFT_BRACE = "TOKEN_LEFT_BRACE"
-    TOKEN_RIGHT_BRACE = "TOKEN_RIGHT_BRACE"
-    TOKEN_COMMA = "TOKEN_COMMA"
-    TOKEN_MINUS = "TOKEN_MINUS"
-    TOKEN_PLUS = "TOKEN_PLUS"
-    TOKEN_SEMICOLON = "TOKEN_SEMICOLON"
-    TOKEN_SLASH = "TOKEN_SLASH"
-    TOKEN_STAR = "TOKEN_STAR"
+    TOKEN_LEFT_PAREN = 0
+    TOKEN_RIGHT_PAREN = 1
+    TOKEN_LEFT_BRACE = 2
+    TOKEN_RIGHT_BRACE = 3
+    TOKEN_COMMA = 4
+    TOKEN_MINUS = 5
+    TOKEN_PLUS = 6
+    TOKEN_SEMICOLON = 7
+    TOKEN_SLASH = 8
+    TOKEN_STAR = 9
 
     # One or two character tokens
-    TOKEN_EQUAL = "TOKEN_EQUAL"
-    TOKEN_EQUAL_EQUAL = "TOKEN_EQUAL_EQUAL"
+    TOKEN_EQUAL = 10
+    TOKEN_EQUAL_EQUAL = 11
 
     # Literals
-    TOKEN_IDENTIFIER = "TOKEN_IDENTIFIER"
-    TOKEN_NUMBER = "TOKEN_NUMBER"
+    TOKEN_IDENTIFIER = 12
+    TOKEN_NUMBER = 13
 
     # Keywords
-    TOKEN_FUN = "TOKEN_FUN"
-    TOKEN_NIL = "TOKEN_NIL"
-    TOKEN_PRINT = "TOKEN_PRINT"
-    TOKEN_RETURN = "TOKEN_RETURN"
-    TOKEN_VAR = "TOKEN_VAR"
-    TOKEN_ERROR = "TOKEN_ERROR"
-    TOKEN_EOF = "TOKEN_EOF"
+    TOKEN_FUN = 14
+    TOKEN_NIL = 15
+    TOKEN_PRINT = 16
+    TOKEN_RETURN = 17
+    TOKEN_VAR = 18
+    TOKEN_ERROR = 19
+    TOKEN_EOF = 20
 
 
 class Token():
+    __slots__ = ("token_type", "start", "length", "source", "line")
+
     def __init__(self, token_type, start, length, source, line):
         # type: (TokenType, int, int, Optional[Source], int) -> None
         """Stores details of tokens converted from source code."""
@@ -64,14 +68,56 @@ double_token_map = {
     "=": (TokenType.TOKEN_EQUAL_EQUAL, TokenType.TOKEN_EQUAL),
 }
 
+keyword_map = {
+    "fun": TokenType.TOKEN_FUN,
+    "let": TokenType.TOKEN_VAR,
+    "print": TokenType.TOKEN_PRINT,
+    "return": TokenType.TOKEN_RETURN,
+}
+
+# Runs of whitespace and line comments, which may be empty
+WHITESPACE_PATTERN = re.compile(r"(?:[ \r\t\n]+|//[^\n]*)*")
+
+# Lookup tables indexed by character code, covering ASCII only
+CHARACTER_COUNT = 128
+
+SINGLE_TOKENS = [None] * CHARACTER_COUNT  # type: List[Optional[TokenType]]
+for character, token_type in single_token_map.items():
+    SINGLE_TOKENS[ord(character)] = token_type
+
+DOUBLE_TOKENS = [None] * CHARACTER_COUNT  # type: List[Optional[Tuple[TokenType, TokenType]]]
+for character, token_types in double_token_map.items():
+    DOUBLE_TOKENS[ord(character)] = token_types
+
+CLASS_ALPHA = 1
+CLASS_DIGIT = 2
+
+CHARACTER_CLASSES = bytearray(CHARACTER_COUNT)
+for code in range(CHARACTER_COUNT):
+    if chr(code).isalpha() or chr(code) == "_":
+        CHARACTER_CLASSES[code] = CLASS_ALPHA
+    elif chr(code).isdigit():
+        CHARACTER_CLASSES[code] = CLASS_DIGIT
+
+# Fixed lexemes indexed by token type, shared by every token of that type
+LEXEMES = [None] * len(TokenType)  # type: List[Optional[Source]]
+for character, token_type in single_token_map.items():
+    LEXEMES[token_type] = character
+
+LEXEMES[TokenType.TOKEN_EQUAL] = "="
+LEXEMES[TokenType.TOKEN_EQUAL_EQUAL] = "=="
+LEXEMES[TokenType.TOKEN_EOF] = ""
+
 
 class Scanner():
+    __slots__ = ("start", "current", "source", "line")
+
     def __init__(self):
         # type: () -> None
         """Stores details pertaining to source code."""
         self.start = 0
         self.current = 0
-        self.source = None  # type: Optional[Source]
+        self.source = ""  # type: Source
         self.line = 0
 
 
@@ -85,72 +131,36 @@ def init_scanner(source):
     return searcher
 
 
-def is_alpha(character):
-    # type: (Character) -> bool
-    """Checks if character is an alphabet."""
-    is_lowercase = character >= "a" and character <= "z"
-    is_uppercase = character >= "A" and character <= "Z"
-    is_underscore = character == "_"
-
-    return is_lowercase or is_uppercase or is_underscore
-
-
-def is_digit(character):
-    # type: (Character) -> bool
-    """Checks if character is a digit."""
-    return character >= "0" and character <= "9"
-
-
 def is_at_end(searcher):
     # type: (Scanner) -> bool
     """Checks if scanner at the end of the source code."""
-    assert searcher.source is not None
     return searcher.current == len(searcher.source)
 
 
-def advance(searcher):
-    # type: (Scanner) -> Tuple[Scanner, Character]
-    """Consumes and returns current character."""
-    searcher.current += 1
-
-    assert searcher.source is not None
-    return searcher, searcher.source[searcher.current - 1]
-
-
-def peek(searcher):
-    # type: (Scanner) -> Character
-    """Returns the current character without consuming it."""
-    assert searcher.source is not None
-    return searcher.source[searcher.current]
-
-
-def peek_next(searcher):
-    # type: (Scanner) -> Character
-    """Returns the character past the current character without consuming it."""
-    assert searcher.source is not None
-    return searcher.source[searcher.current + 1]
-
-
 def match(searcher, expected):
-    # type: (Scanner, Character) -> Tuple[Scanner, bool]
+    # type: (Scanner, Character) -> bool
     """Checks if current character is the desired character."""
-    assert searcher.source is not None
     if is_at_end(searcher) or searcher.source[searcher.current] != expected:
-        return searcher, False
+        return False
 
     searcher.current += 1
-    return searcher, True
+    return True
 
 
 def make_token(searcher, token_type):
     # type: (Scanner, TokenType) -> Token
     """Constructor-like function to create tokens."""
-    assert searcher.source is not None
+    source = LEXEMES[token_type]
+
+    # Only tokens without a fixed lexeme need a slice of the source
+    if source is None:
+        source = searcher.source[searcher.start:searcher.current]
+
     return Token(
         token_type=token_type,
         start=searcher.start,
         length=searcher.current - searcher.start,
-        source=searcher.source[searcher.start:searcher.current],
+        source=source,
         line=searcher.line,
     )
 
@@ -168,91 +178,68 @@ def error_token(searcher, message):
 
 
 def skip_whitespace(searcher):
-    # type: (Scanner) -> Scanner
+    # type: (Scanner) -> None
     """Consumes every whitespace characters encountered."""
-    while True:
-        # Check since not using EOF marker
-        if is_at_end(searcher):
-            return searcher
-
-        character = peek(searcher)
-
-        if character in [" ", "\r", "\t"]:
-            searcher, _ = advance(searcher)
-            continue
-
-        elif character == "\n":
-            searcher.line += 1
-            searcher, _ = advance(searcher)
-            continue
-
-        elif character == "/":
-            if peek_next(searcher) == "/":
-                while peek(searcher) != "\n" and not is_at_end(searcher):
-                    searcher, _ = advance(searcher)
-                continue
-            else:
-                return searcher
+    # Whitespace and comments are matched in one pass, then lines counted.
+    skipped = WHITESPACE_PATTERN.match(searcher.source, searcher.current)
 
-        return searcher
+    # Pattern also matches the empty string, so a match is always found
+    assert skipped is not None
+    end = skipped.end()
 
+    searcher.line += searcher.source.count("\n", searcher.current, end)
+    searcher.current = end
 
-def check_keyword(searcher, start, length, rest, token_type):
-    # type: (Scanner, int, int, str, TokenType) -> TokenType
-    """Utility function to check full keyword matches."""
-    index_start = searcher.start + start
-    index_end = index_start + length
 
-    assert searcher.source is not None
-    is_correct_length = searcher.current - searcher.start == start + length
-    is_actual_match = searcher.source[index_start:index_end] == rest
+def identifier(searcher):
+    # type: (Scanner) -> Token
+    """Converts identifier into token."""
+    source = searcher.source
+    current = searcher.current
+    length = len(source)
 
-    if is_correct_length and is_actual_match:
-        return token_type
+    # Any alphabet or digit character continues the identifier
+    while current < length:
+        code = ord(source[current])
 
-    return TokenType.TOKEN_IDENTIFIER
+        if code >= CHARACTER_COUNT or not CHARACTER_CLASSES[code]:
+            break
 
+        current += 1
 
-def identifier_type(searcher):
-    # type: (Scanner) -> TokenType
-    """Checks identifier keywords and returns identifier token type."""
-    assert searcher.source is not None
-    character = searcher.source[searcher.start]
+    searcher.current = current
 
-    if character == "f":
-        return check_keyword(searcher, 1, 2, "un", TokenType.TOKEN_FUN)
-    elif character == "l":
-        return check_keyword(searcher, 1, 2, "et", TokenType.TOKEN_VAR)
-    elif character == "p":
-        return check_keyword(searcher, 1, 4, "rint", TokenType.TOKEN_PRINT)
-    elif character == "r":
-        return check_keyword(searcher, 1, 5, "eturn", TokenType.TOKEN_RETURN)
+    token = make_token(searcher, TokenType.TOKEN_IDENTIFIER)
+    assert token.source is not None
 
-    return TokenType.TOKEN_IDENTIFIER
+    if token.source in keyword_map:
+        token.token_type = keyword_map[token.source]
+    else:
+        # Interned so the compiler can compare identifiers by identity
+        token.source = sys.intern(token.source)
 
-
-def identifier(searcher):
-    # type: (Scanner) -> Token
-    """Converts identifier into token."""
-    while is_alpha(peek(searcher)) or is_digit(peek(searcher)):
-        searcher, _ = advance(searcher)
-
-    return make_token(searcher, identifier_type(searcher))
+    return token
 
 
 def number(searcher):
     # type: (Scanner) -> Token
     """Convert number into token."""
-    while is_digit(peek(searcher)):
-        searcher, _ = advance(searcher)
+    source = searcher.source
+    current = searcher.current
+    length = len(source)
+
+    while current < length and "0" <= source[current] <= "9":
+        current += 1
 
     # Look for a fractional part
-    if peek(searcher) == "." and is_digit(peek_next(searcher)):
+    if current + 1 < length and source[current] == "." and "0" <= source[current + 1] <= "9":
         # Consume the period
-        searcher, _ = advance(searcher)
+        current += 1
+
+        while current < length and "0" <= source[current] <= "9":
+            current += 1
 
-        while is_digit(peek(searcher)):
-            searcher, _ = advance(searcher)
+    searcher.current = current
 
     return make_token(searcher, TokenType.TOKEN_NUMBER)
 
@@ -260,29 +247,41 @@ def number(searcher):
 def scan_token(searcher):
     # type: (Scanner) -> Token
     """Parses through source code and converts into tokens."""
-    searcher = skip_whitespace(searcher)
-    searcher.start = searcher.current
+    skip_whitespace(searcher)
 
-    if is_at_end(searcher):
+    # Read once and shared by the end check and first character below
+    source = searcher.source
+    current = searcher.current
+    searcher.start = current
+
+    if current == len(source):
         return make_token(searcher, TokenType.TOKEN_EOF)
 
-    searcher, character = advance(searcher)
+    code = ord(source[current])
+    searcher.current = current + 1
+
+    if code < CHARACTER_COUNT:
+        character_class = CHARACTER_CLASSES[code]
+
+        if character_class == CLASS_ALPHA:
+            return identifier(searcher)
 
-    if is_alpha(character):
-        return identifier(searcher)
+        if character_class == CLASS_DIGIT:
+            return number(searcher)
 
-    if is_digit(character):
-        return number(searcher)
+        token_type = SINGLE_TOKENS[code]
 
-    if character in single_token_map:
-        return make_token(searcher, single_token_map[character])
+        if token_type is not None:
+            return make_token(searcher, token_type)
 
-    elif character in double_token_map:
-        searcher, condition = match(searcher, "=")
+        token_types = DOUBLE_TOKENS[code]
 
-        if condition:
-            return make_token(searcher, double_token_map[character][0])
-        else:
-            return make_token(searcher, double_token_map[character][1])
+        if token_types is not None:
+            condition = match(searcher, "=")
+
+            if condition:
+                return make_token(searcher, token_types[0])
+            else:
+                return make_token(searcher, token_types[1])
 
     return error_token(searcher, "Unexpected character.")
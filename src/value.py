@@ -41,6 +41,9 @@ def write_value_array(value_array, val):
     """Append value to the end of the value array."""
     # If current array not have capacity for new value, grow array.
     if value_array.capacity < value_array.count + 1:
+        if value_array.values is None:
+            value_array.values = []
+
         old_capacity = value_array.capacity
         value_array.capacity = memory.grow_capacity(old_capacity)
         value_array.values = memory.grow_array(
@@ -1,5 +1,6 @@
 import enum
-from typing import List, Optional, Tuple, Union
+import operator
+from typing import Any, Callable, List, Optional, Tuple, Union
 
 import chunk
 import compiler
@@ -89,7 +90,7 @@ def push(frame, val):
 
 
 def pop(frame):
-    # type: (CallFrame) -> Tuple[CallFrame, StackItem]
+    # type: (CallFrame) -> StackItem
     """Pop most recently pushed value."""
     frame.slots_top -= 1
 
@@ -97,17 +98,17 @@ def pop(frame):
     val = frame.slots[frame.slots_top]
 
     assert val is not None
-    return frame, val
+    return val
 
 
 def peek(frame, distance):
-    # type: (CallFrame, int) -> Tuple[CallFrame, StackItem]
+    # type: (CallFrame, int) -> StackItem
     """Reads value but does not pop it."""
     assert frame.slots is not None
     val = frame.slots[frame.slots_top - 1 - distance]
 
     assert val is not None
-    return frame, val
+    return val
 
 
 def call(emulator, fun, arg_count):
@@ -145,43 +146,165 @@ def call_value(emulator, fun, arg_count):
 
 
 def read_byte(frame):
-    # type: (CallFrame) -> Tuple[CallFrame, chunk.Byte]
+    # type: (CallFrame) -> chunk.Byte
     """Reads byte at current instruction pointer and advances pointer."""
     frame.ip += 1
 
     assert frame.fun is not None
     assert frame.fun.bytecode is not None
     assert frame.fun.bytecode.code is not None
-    instruction = frame.fun.bytecode.code[frame.ip - 1]
-
-    assert instruction is not None
-    return frame, instruction
+    return frame.fun.bytecode.code[frame.ip - 1]
 
 
 def read_constant(frame):
-    # type: (CallFrame) -> Tuple[CallFrame, StackItem]
+    # type: (CallFrame) -> StackItem
     """Reads next byte from bytecode, treats result as index and looks up
     corresponding location in constants table."""
-    frame, offset = read_byte(frame)
+    offset = read_byte(frame)
 
     assert frame.fun is not None
     assert frame.fun.bytecode is not None
     assert frame.fun.bytecode.constants is not None
     assert frame.fun.bytecode.constants.values is not None
-    assert isinstance(offset, int)
     constant = frame.fun.bytecode.constants.values[offset]
 
     assert constant is not None
-    return frame, constant
+    return constant
 
 
 def binary_op(frame, op):
-    # type: (CallFrame, str) -> CallFrame
+    # type: (CallFrame, Callable[[Any, Any], StackItem]) -> CallFrame
     """Execute binary operation on two items at the top of the stack."""
-    frame, b = pop(frame)
-    frame, a = pop(frame)
+    b = pop(frame)
+    a = pop(frame)
+
+    return push(frame, op(a, b))
+
+
+def op_constant(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Push constant read from the constants table."""
+    constant = read_constant(frame)
+    return push(frame, constant)
+
+
+def op_nil(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Push nil value."""
+    return push(frame, value.ValueType.VAL_NIL)
+
+
+def op_pop(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Discard value at the top of the stack."""
+    pop(frame)
+    return frame
+
+
+def op_popn(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Discard the number of values given by the operand."""
+    count = read_byte(frame)
+    frame.slots_top -= count
+    return frame
+
+
+def op_get_local(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Push value of local variable in slot given by the operand."""
+    slot = read_byte(frame)
+    assert frame.slots is not None
+    if slot >= len(frame.slots):
+        return None
+    val = frame.slots[slot]
+    if val is None:
+        return None
+    return push(frame, val)
+
+
+def op_set_local(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Store value at the top of the stack in slot given by the operand."""
+    slot = read_byte(frame)
+    val = peek(frame, 0)
+    assert frame.slots is not None
+    if slot >= len(frame.slots):
+        return None
+    frame.slots[slot] = val
+    return frame
+
+
+def op_add(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Add two values at the top of the stack."""
+    return binary_op(frame, operator.add)
+
+
+def op_subtract(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Subtract two values at the top of the stack."""
+    return binary_op(frame, operator.sub)
 
-    return push(frame, eval("a {} b".format(op)))
+
+def op_multiply(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Multiply two values at the top of the stack."""
+    return binary_op(frame, operator.mul)
+
+
+def op_divide(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Divide two values at the top of the stack."""
+    return binary_op(frame, operator.truediv)
+
+
+def op_negate(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Negate value at the top of the stack."""
+    val = pop(frame)
+    assert not isinstance(val, function.Function)
+    assert not isinstance(val, value.ValueType)
+    val = -val
+    return push(frame, val)
+
+
+def op_print(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Print and record value at the top of the stack."""
+    val = pop(frame)
+    print(val)
+    assert not isinstance(val, function.Function)
+    assert not isinstance(val, value.ValueType)
+    assert emulator.output is not None
+    emulator.output.append(val)
+    return frame
+
+
+def op_call(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Call function below the arguments and switch to its frame."""
+    arg_count = read_byte(frame)
+    fun = peek(frame, arg_count)
+    assert isinstance(fun, function.Function)
+    emulator, condition = call_value(emulator, fun, arg_count)
+    if not condition:
+        return None
+    assert emulator.frames is not None
+    return emulator.frames[emulator.frame_count - 1]
+
+
+def op_return(emulator, frame):
+    # type: (VM, CallFrame) -> Optional[CallFrame]
+    """Return to the calling frame with the result, or stop after the script
+    frame returns."""
+    result = pop(frame)
+    emulator.frame_count -= 1
+    if emulator.frame_count == 0:
+        result = pop(frame)
+        return None
+    assert emulator.frames is not None
+    frame = emulator.frames[emulator.frame_count - 1]
+    return push(frame, result)
 
 
 def run(emulator):
@@ -189,87 +312,26 @@ def run(emulator):
     """Executes instructions in bytecode."""
     assert emulator.frames is not None
     frame = emulator.frames[emulator.frame_count - 1]
+    instructions = INSTRUCTIONS
 
+    # Handlers return the frame to continue with, or None to stop
     while True:
-        frame, instruction = read_byte(frame)
-
-        if instruction == chunk.OpCode.OP_CONSTANT:
-            frame, constant = read_constant(frame)
-            frame = push(frame, constant)
-
-        elif instruction == chunk.OpCode.OP_NIL:
-            frame = push(frame, value.ValueType.VAL_NIL)
-
-        elif instruction == chunk.OpCode.OP_POP:
-            frame, _ = pop(frame)
-
-        elif instruction == chunk.OpCode.OP_GET_LOCAL:
-            frame, slot = read_byte(frame)
-            assert frame.slots is not None
-            assert isinstance(slot, int)
-            val = frame.slots[slot]
-            if val is None:
-                break
-            frame = push(frame, val)
-
-        elif instruction == chunk.OpCode.OP_SET_LOCAL:
-            frame, slot = read_byte(frame)
-            frame, val = peek(frame, 0)
-            assert frame.slots is not None
-            assert isinstance(slot, int)
-            frame.slots[slot] = val
-
-        elif instruction == chunk.OpCode.OP_ADD:
-            frame = binary_op(frame, "+")
-
-        elif instruction == chunk.OpCode.OP_SUBTRACT:
-            frame = binary_op(frame, "-")
-
-        elif instruction == chunk.OpCode.OP_MULTIPLY:
-            frame = binary_op(frame, "*")
-
-        elif instruction == chunk.OpCode.OP_DIVIDE:
-            frame = binary_op(frame, "/")
-
-        elif instruction == chunk.OpCode.OP_NEGATE:
-            frame, val = pop(frame)
-            assert not isinstance(val, function.Function)
-            assert not isinstance(val, value.ValueType)
-            val = -val
-            frame = push(frame, val)
-
-        elif instruction == chunk.OpCode.OP_PRINT:
-            frame, val = pop(frame)
-            print(val)
-            assert not isinstance(val, function.Function)
-            assert not isinstance(val, value.ValueType)
-            assert emulator.output is not None
-            emulator.output.append(val)
-
-        elif instruction == chunk.OpCode.OP_CALL:
-            frame, arg_count = read_byte(frame)
-            assert isinstance(arg_count, int)
-            frame, fun = peek(frame, arg_count)
-            assert isinstance(fun, function.Function)
-            emulator, condition = call_value(emulator, fun, arg_count)
-            if not condition:
-                break
-            assert emulator.frames is not None
-            frame = emulator.frames[emulator.frame_count - 1]
-
-        elif instruction == chunk.OpCode.OP_RETURN:
-            frame, result = pop(frame)
-            emulator.frame_count -= 1
-            if emulator.frame_count == 0:
-                frame, result = pop(frame)
-                assert isinstance(instruction, chunk.OpCode)
-                return InterpretResult.INTERPRET_OK, instruction, emulator.output
-            assert emulator.frames is not None
-            frame = emulator.frames[emulator.frame_count - 1]
-            frame = push(frame, result)
-
-    assert isinstance(instruction, chunk.OpCode)
-    return InterpretResult.INTERPRET_RUNTIME_ERROR, instruction, emulator.output
+        instruction = read_byte(frame)
+        handler = instructions[instruction]
+
+        assert handler is not None
+        next_frame = handler(emulator, frame)
+
+        if next_frame is None:
+            break
+
+        frame = next_frame
+
+    # Only a return from the script frame leaves no frames behind
+    if emulator.frame_count == 0:
+        return InterpretResult.INTERPRET_OK, chunk.OpCode(instruction), emulator.output
+
+    return InterpretResult.INTERPRET_RUNTIME_ERROR, chunk.OpCode(instruction), emulator.output
 
 
 def interpret(emulator, source, debug_level):
@@ -289,3 +351,23 @@ def interpret(emulator, source, debug_level):
     emulator, condition = call_value(emulator, fun, 0)
 
     return run(emulator)
+
+
+Instruction = Callable[[VM, CallFrame], Optional[CallFrame]]
+
+# Instruction handlers indexed by opcode
+INSTRUCTIONS = [None] * len(chunk.OpCode)  # type: List[Optional[Instruction]]
+INSTRUCTIONS[chunk.OpCode.OP_CONSTANT] = op_constant
+INSTRUCTIONS[chunk.OpCode.OP_NIL] = op_nil
+INSTRUCTIONS[chunk.OpCode.OP_POP] = op_pop
+INSTRUCTIONS[chunk.OpCode.OP_POPN] = op_popn
+INSTRUCTIONS[chunk.OpCode.OP_GET_LOCAL] = op_get_local
+INSTRUCTIONS[chunk.OpCode.OP_SET_LOCAL] = op_set_local
+INSTRUCTIONS[chunk.OpCode.OP_ADD] = op_add
+INSTRUCTIONS[chunk.OpCode.OP_SUBTRACT] = op_subtract
+INSTRUCTIONS[chunk.OpCode.OP_MULTIPLY] = op_multiply
+INSTRUCTIONS[chunk.OpCode.OP_DIVIDE] = op_divide
+INSTRUCTIONS[chunk.OpCode.OP_NEGATE] = op_negate
+INSTRUCTIONS[chunk.OpCode.OP_PRINT] = op_print
+INSTRUCTIONS[chunk.OpCode.OP_CALL] = op_call
+INSTRUCTIONS[chunk.OpCode.OP_RETURN] = op_return
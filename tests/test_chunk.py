@@ -43,3 +43,34 @@ def test_constant_chunk():
     assert bytecode.code[2] == chunk.OpCode.OP_RETURN
 
     chunk.free_chunk(bytecode)
+
+
+def test_extend_chunk():
+    # type: () -> None
+    bytecode = chunk.init_chunk()
+
+    bytecode = chunk.write_chunk(bytecode, chunk.OpCode.OP_NIL, 123)
+    bytecode = chunk.extend_chunk(bytecode, [chunk.OpCode.OP_POP] * 9, 124)
+    assert bytecode.count == 10
+    assert bytecode.capacity == 16
+    assert bytecode.code is not None
+    assert bytecode.code[0] == chunk.OpCode.OP_NIL
+    assert list(bytecode.code[1:10]) == [chunk.OpCode.OP_POP] * 9
+    assert bytecode.lines is not None
+    assert bytecode.lines[0] == 123
+    assert bytecode.lines[9] == 124
+
+    chunk.free_chunk(bytecode)
+
+
+def test_compact_chunk():
+    # type: () -> None
+    bytecode = chunk.init_chunk()
+
+    bytecode = chunk.write_chunk(bytecode, chunk.OpCode.OP_RETURN, 123)
+    assert isinstance(bytecode.code, bytearray)
+    assert bytecode.lines is not None
+    assert bytecode.lines.typecode == "i"
+    assert bytecode.code[0] == chunk.OpCode.OP_RETURN
+
+    chunk.free_chunk(bytecode)
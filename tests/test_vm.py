@@ -1,13 +1,23 @@
 import chunk
+import compiler
 import function
+import pytest
 import vm
-from typing import List, TYPE_CHECKING
+from typing import Iterator, List, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     import scanner
     import value
 
 
+@pytest.fixture(autouse=True)
+def clear_compile_cache():
+    # type: () -> Iterator[None]
+    compiler.compile_cache.clear()
+    yield
+    compiler.compile_cache.clear()
+
+
 def test_manual_init():
     # type: () -> None
     bytecode = chunk.init_chunk()
@@ -68,6 +78,35 @@ def interpret(source, result, opcode, output):
     vm.free_vm(emulator)
 
 
+def instructions(bytecode):
+    # type: (chunk.Chunk) -> List[Tuple[chunk.OpCode, Optional[int]]]
+    """Decode chunk into opcodes paired with their operand byte, if any."""
+    operand_opcodes = (
+        chunk.OpCode.OP_CONSTANT,
+        chunk.OpCode.OP_POPN,
+        chunk.OpCode.OP_GET_LOCAL,
+        chunk.OpCode.OP_SET_LOCAL,
+        chunk.OpCode.OP_CALL,
+    )
+
+    assert bytecode.code is not None
+    code = bytecode.code
+    decoded = []  # type: List[Tuple[chunk.OpCode, Optional[int]]]
+    offset = 0
+
+    while offset < bytecode.count:
+        opcode = chunk.OpCode(code[offset])
+
+        if opcode in operand_opcodes:
+            decoded.append((opcode, code[offset + 1]))
+            offset += 2
+        else:
+            decoded.append((opcode, None))
+            offset += 1
+
+    return decoded
+
+
 def test_basic_add():
     # type: () -> None
     interpret(
@@ -98,6 +137,62 @@ def test_basic_multiply():
     )
 
 
+def test_repeated_literals():
+    # type: () -> None
+    source = "{ let a = 1; print a + 1 + a * 1; }"
+
+    fun = compiler.compile(source, 0)
+    assert fun is not None
+    assert fun.bytecode is not None
+    assert fun.bytecode.constants is not None
+    assert fun.bytecode.constants.count == 1
+
+    interpret(
+        source=source,
+        result=vm.InterpretResult.INTERPRET_OK,
+        opcode=chunk.OpCode.OP_RETURN,
+        output=[3],
+    )
+
+
+def test_signed_zero_constants():
+    # type: () -> None
+    source = "{ let a = 1; print a * 0; print a * -0; print a * 0.0; }"
+
+    # 0 and 0.0 share a constant, while the folded -0 keeps its own
+    fun = compiler.compile(source, 0)
+    assert fun is not None
+    assert fun.bytecode is not None
+    assert fun.bytecode.constants is not None
+    assert fun.bytecode.constants.values is not None
+    assert fun.bytecode.constants.count == 3
+    assert str(fun.bytecode.constants.values[2]) == "-0.0"
+
+    interpret(
+        source=source,
+        result=vm.InterpretResult.INTERPRET_OK,
+        opcode=chunk.OpCode.OP_RETURN,
+        output=[0, 0, 0],
+    )
+
+
+def test_constant_folding():
+    # type: () -> None
+    source = "print -(2 * 3) + 10 / 4;"
+
+    fun = compiler.compile(source, 0)
+    assert fun is not None
+    assert fun.bytecode is not None
+    assert fun.bytecode.count == 5
+
+    interpret(
+        source=source,
+        result=vm.InterpretResult.INTERPRET_OK,
+        opcode=chunk.OpCode.OP_RETURN,
+        output=[-3.5],
+    )
+
+
 def test_basic_divide():
     # type: () -> None
     interpret(
@@ -118,6 +213,39 @@ def test_basic_negate():
     )
 
 
+def test_operator_precedence():
+    # type: () -> None
+    interpret(
+        source="print 1 + 2 * 3 - 8 / 4 - 1;",
+        result=vm.InterpretResult.INTERPRET_OK,
+        opcode=chunk.OpCode.OP_RETURN,
+        output=[4],
+    )
+
+
+def test_unary_operators():
+    # type: () -> None
+    interpret(
+        source="print - - 3 * 2 - -(1 + 2);",
+        result=vm.InterpretResult.INTERPRET_OK,
+        opcode=chunk.OpCode.OP_RETURN,
+        output=[9],
+    )
+
+
+def test_comments():
+    # type: () -> None
+    interpret(
+        source="""\
+        // leading comment
+        print 6 / 2; // trailing comment
+        // final comment""",
+        result=vm.InterpretResult.INTERPRET_OK,
+        opcode=chunk.OpCode.OP_RETURN,
+        output=[3],
+    )
+
+
 def test_basic_scope():
     # type: () -> None
     interpret(
@@ -209,6 +337,38 @@ def test_multiple_variable_multiple_scope():
     )
 
 
+def test_scope_exit_pops():
+    # type: () -> None
+    source = """\
+    {
+        let a = 1;
+        {
+            let b = 2;
+            let c = 3;
+        }
+        print a;
+    }
+    """
+
+    fun = compiler.compile(source, 0)
+    assert fun is not None
+    assert fun.bytecode is not None
+
+    pops = [
+        instruction for instruction in instructions(fun.bytecode)
+        if instruction[0] in (chunk.OpCode.OP_POP, chunk.OpCode.OP_POPN)
+    ]
+    # Inner scope drops b and c together, outer scope drops a alone
+    assert pops == [(chunk.OpCode.OP_POPN, 2), (chunk.OpCode.OP_POP, None)]
+
+    interpret(
+        source=source,
+        result=vm.InterpretResult.INTERPRET_OK,
+        opcode=chunk.OpCode.OP_RETURN,
+        output=[1],
+    )
+
+
 def test_multiple_variable_scope_error():
     # type: () -> None
     interpret(
@@ -246,3 +406,40 @@ def test_basic_function():
         opcode=chunk.OpCode.OP_RETURN,
         output=[1],
     )
+
+
+def test_cached_compile():
+    # type: () -> None
+    source = """\
+    {
+        fun a() {
+            return 1 + 2;
+        }
+
+        print a();
+    }
+    """
+
+    first = compiler.compile(source, 0)
+    assert source in compiler.compile_cache
+
+    second = compiler.compile(source, 0)
+    assert first is not None
+    assert second is not None
+    assert second is not first
+
+    # Cache hits are copies, so freeing one run's chunks leaves the cache intact
+    assert first.bytecode is not None
+    assert second.bytecode is not None
+    assert second.bytecode is not first.bytecode
+    assert second.bytecode.count == first.bytecode.count
+    assert second.bytecode.code == first.bytecode.code
+    assert second.bytecode.lines == first.bytecode.lines
+
+    for _ in range(2):
+        interpret(
+            source=source,
+            result=vm.InterpretResult.INTERPRET_OK,
+            opcode=chunk.OpCode.OP_RETURN,
+            output=[3],
+        )